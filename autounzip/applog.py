@@ -0,0 +1,106 @@
+import collections
+import json
+import logging
+import logging.handlers
+import os
+
+from .config import settings_dir
+
+DEFAULT_MAX_LINES = 5000
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+DISPLAY_FORMAT = "[%(asctime)s] %(message)s"
+DISPLAY_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def default_log_path():
+    folder = os.path.join(settings_dir(), "logs")
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, "auto-unzipper.log")
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line, so the rotated files can be grepped or fed to
+    # a log shipper without parsing free text.
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RingBufferHandler(logging.Handler):
+    # Keeps the last max_lines formatted messages in memory. Messages emitted
+    # since the previous drain() are queued separately so a UI can pick them
+    # up in batches instead of redrawing on every record.
+
+    def __init__(self, max_lines=DEFAULT_MAX_LINES):
+        super().__init__()
+        self.setFormatter(logging.Formatter(DISPLAY_FORMAT, DISPLAY_DATE_FORMAT))
+        self.lines = collections.deque(maxlen=max_lines)
+        self._pending = collections.deque(maxlen=max_lines)
+
+    @property
+    def max_lines(self):
+        return self.lines.maxlen
+
+    def set_max_lines(self, max_lines):
+        self.acquire()
+        try:
+            self.lines = collections.deque(self.lines, maxlen=max_lines)
+            self._pending = collections.deque(self._pending, maxlen=max_lines)
+        finally:
+            self.release()
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        self.lines.append(line)
+        self._pending.append(line)
+
+    def drain(self):
+        self.acquire()
+        try:
+            pending = list(self._pending)
+            self._pending.clear()
+        finally:
+            self.release()
+        return pending
+
+    def snapshot(self):
+        self.acquire()
+        try:
+            return list(self.lines)
+        finally:
+            self.release()
+
+    def clear(self):
+        self.acquire()
+        try:
+            self.lines.clear()
+            self._pending.clear()
+        finally:
+            self.release()
+
+
+def setup_file_logging(path=None, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT,
+                       logger_name="autounzip"):
+    path = path or default_log_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+    )
+    handler.setFormatter(JsonFormatter())
+    logging.getLogger(logger_name).addHandler(handler)
+    return handler
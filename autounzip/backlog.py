@@ -0,0 +1,163 @@
+import collections
+import logging
+import os
+import threading
+
+log = logging.getLogger(__name__)
+
+# Archives found when monitoring starts are queued behind anything that
+# arrives while they are worked through (lower priority values run first).
+BACKLOG_PRIORITY = 10
+# How many backlog archives may be handed out and not finished yet.
+BACKLOG_BATCH = 32
+# How many directory entries one monitor tick looks at, at most.
+BACKLOG_PAGE = 500
+
+
+def path_key(folder, path):
+    # The position of path in the order iter_files() walks folder.
+    return tuple(os.path.relpath(path, folder).split(os.sep))
+
+
+def iter_files(folder, recursive=True, excluded=(), after=None, since=None, listed=None, _prefix=()):
+    # Lazily yields the os.DirEntry of every file under folder, depth first
+    # with the names of each directory in sorted order, so the walk can be
+    # resumed. Files up to the key after are left out, except those modified
+    # at or after since. The names in each folder are put into the dict
+    # listed as the folder is read.
+    try:
+        with os.scandir(folder) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError as e:
+        log.debug(f"Could not scan {folder}: {e}")
+        return
+    if listed is not None:
+        listed[folder] = {entry.name for entry in entries}
+    for entry in entries:
+        key = _prefix + (entry.name,)
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            continue
+        if is_dir:
+            if not recursive or entry.path in excluded:
+                continue
+            # A folder entirely before the cursor only needs visiting for
+            # files that changed since.
+            if after is not None and since is None and key < after[:len(key)]:
+                continue
+            yield from iter_files(entry.path, True, excluded, after, since, listed, key)
+            continue
+        if after is not None and key <= after:
+            try:
+                if since is None or entry.stat().st_mtime < since:
+                    continue
+            except OSError:
+                continue
+        yield entry
+
+
+class Backlog:
+    # The files that were already in one root when monitoring started. They
+    # are walked lazily with iter_files() and handed out a page at a time.
+    # position is the key up to which every file was either skipped or had
+    # its extraction finished; persisted, it lets an interrupted backlog
+    # resume there. since is when the first attempt at this backlog started,
+    # so files changed after it are picked up behind the position too.
+
+    def __init__(self, root, started_at, excluded=(), saved=None):
+        self.root = root
+        self.position, self.since = saved or (None, started_at)
+        self.resumed = saved is not None
+        self.last_key = None
+        self.exhausted = False
+        self._listed = {}
+        self._entries = iter_files(root.folder, root.recursive, excluded, self.position,
+                                   self.since if self.resumed else None, self._listed)
+        self._pending = collections.OrderedDict()
+        self._in_flight = set()
+        self._saved_position = self.position
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return len(self._in_flight)
+
+    @property
+    def complete(self):
+        with self._lock:
+            return self.exhausted and not self._pending
+
+    def key(self, path):
+        return path_key(self.root.folder, path)
+
+    def ahead(self, path):
+        # True for files the walk is still going to find: past its current
+        # position, and either in a folder it hasn't read yet or among the
+        # names it read there.
+        if self.exhausted:
+            return False
+        folder, name = os.path.split(path)
+        names = self._listed.get(folder)
+        if names is not None and name not in names:
+            return False
+        return self.last_key is None or self.key(path) > self.last_key
+
+    def next(self):
+        entry = next(self._entries, None)
+        if entry is None:
+            self.exhausted = True
+            self._listed.clear()
+        else:
+            self.last_key = self.key(entry.path)
+        return entry
+
+    def handed_out(self, path, counted=True):
+        # Volumes of a set waiting for its other parts hold the position
+        # back without counting against BACKLOG_BATCH.
+        with self._lock:
+            key = self.key(path)
+            self._pending[key] = False
+            if counted:
+                self._in_flight.add(key)
+
+    def skipped(self, path):
+        with self._lock:
+            self._pending[self.key(path)] = True
+            self._advance()
+
+    def finished(self, paths, success=True):
+        # Frees the slots of a finished job. Archives that failed or were
+        # cancelled keep the position from moving past them, so a resumed
+        # backlog tries them again. Returns True when any of paths was
+        # handed out by this backlog.
+        found = False
+        with self._lock:
+            for path in paths:
+                key = self.key(path)
+                self._in_flight.discard(key)
+                if self._pending.get(key) is False:
+                    found = True
+                    if success:
+                        self._pending[key] = True
+            if found and success:
+                self._advance()
+        return found
+
+    def _advance(self):
+        while self._pending:
+            key, done = next(iter(self._pending.items()))
+            if not done:
+                break
+            del self._pending[key]
+            if self.position is None or key > self.position:
+                self.position = key
+
+    def unsaved(self):
+        # The position if it moved since the last call, else None.
+        with self._lock:
+            if self.position == self._saved_position:
+                return None
+            self._saved_position = self.position
+            return self.position
@@ -0,0 +1,274 @@
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+
+from . import __version__
+from .governor import NORMAL, PRIORITIES, parse_schedule
+
+log = logging.getLogger("autounzip")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="auto-unzipper",
+        description="Automatically extract archives that appear in a folder. "
+                    "Without --watch the desktop GUI is started."
+    )
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    parser.add_argument("--watch", metavar="DIR", action="append",
+                        help="folder to monitor, may be repeated; runs headless without the GUI")
+    parser.add_argument("--roots", metavar="FILE",
+                        help="JSON list of watched folders with their own rules; runs headless without the GUI")
+    parser.add_argument("--out", metavar="DIR", help="folder to extract into (default: DIR/Extracted)")
+    parser.add_argument("--recursive", action="store_true", help="also watch the subfolders of each --watch DIR")
+    parser.add_argument("--include", metavar="GLOB", action="append",
+                        help="only extract archive members matching GLOB, may be repeated; a GLOB without a "
+                             "slash matches file names, one with a slash whole paths")
+    parser.add_argument("--exclude", metavar="GLOB", action="append",
+                        help="don't extract archive members matching GLOB, may be repeated")
+    parser.add_argument("--min-member-size", type=float, default=0, metavar="MB",
+                        help="only extract archive members of at least MB")
+    parser.add_argument("--max-member-size", type=float, default=0, metavar="MB",
+                        help="only extract archive members of at most MB")
+    parser.add_argument("--no-sniff", action="store_true",
+                        help="only pick up files whose name looks like an archive")
+    parser.add_argument("--workers", type=int, default=None, help="parallel extractions (default: CPU count)")
+    parser.add_argument("--zip-processes", type=int, default=0, metavar="N",
+                        help="decompress the entries of large ZIPs in N processes (default: 0, off)")
+    parser.add_argument("--interval", type=int, default=10, help="polling interval in seconds (default: 10)")
+    parser.add_argument("--watcher", choices=("auto", "inotify", "polling"), default="auto",
+                        help="folder watcher backend (default: auto)")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="seconds an archive's size must stay unchanged before extraction (default: 2)")
+    parser.add_argument("--disk-reserve", type=int, default=1024, metavar="MB",
+                        help="only start an extraction when its output fits on the target with this much "
+                             "to spare (default: 1024 MB)")
+    parser.add_argument("--shortest-first", action="store_true",
+                        help="extract the archives with the smallest output first")
+    parser.add_argument("--max-write-rate", type=float, default=0, metavar="MB",
+                        help="limit what extraction writes to MB per second (default: 0, unlimited)")
+    parser.add_argument("--job-threads", type=int, default=0, metavar="N",
+                        help="threads or processes one extraction may use (default: 0, no cap)")
+    parser.add_argument("--priority", choices=PRIORITIES, default=NORMAL,
+                        help="CPU and I/O priority of extraction (default: normal)")
+    parser.add_argument("--schedule", type=parse_schedule, default=[], metavar="WINDOWS",
+                        help="write rates for times of day overriding --max-write-rate, e.g. "
+                             "\"22:00-07:00=0,09:00-18:00=20\" (MB/s, 0 is unlimited)")
+    parser.add_argument("--limits", metavar="FILE",
+                        help="JSON file with write_rate_mb, job_threads, priority and schedule; "
+                             "changes to it are applied while running")
+    parser.add_argument("--delete", action="store_true", help="delete archives after successful extraction")
+    parser.add_argument("--no-verify", action="store_true",
+                        help="delete archives without first checking the output against their CRCs")
+    parser.add_argument("--test", metavar="ARCHIVE", nargs="+",
+                        help="test the given archives without extracting them and exit")
+    parser.add_argument("--seven-zip", metavar="PATH", help="path to the 7-Zip executable")
+    parser.add_argument("--dedup", choices=("off", "skip", "link"), default="off",
+                        help="archives whose content was extracted before are skipped, or their output is "
+                             "recreated from the earlier one with reflinks/hardlinks (default: off)")
+    parser.add_argument("--nested-depth", type=int, default=0,
+                        help="also extract archives found inside archives, up to this many levels (default: 0)")
+    parser.add_argument("--nested-max-size", type=int, default=16 * 1024, metavar="MB",
+                        help="stop when nested archives of one job have written this much (default: 16384 MB)")
+    parser.add_argument("--nested-max-ratio", type=int, default=100,
+                        help="refuse nested archives that expand more than this factor (default: 100)")
+    parser.add_argument("--index", metavar="PATH", help="processed-archive index database "
+                                                        "(default: processed.sqlite3 in the settings folder)")
+    parser.add_argument("--no-index", action="store_true", help="don't remember processed archives")
+    parser.add_argument("--listings", metavar="PATH", help="cache of archive listings "
+                                                           "(default: listings.sqlite3 in the settings folder)")
+    parser.add_argument("--once", action="store_true",
+                        help="extract the archives already in the folder, wait for them and exit")
+    parser.add_argument("--log-file", metavar="PATH", help="also write JSON lines logs to PATH, rotated by size")
+    parser.add_argument("--log-max-bytes", type=int, default=5 * 1024 * 1024,
+                        help="rotate the log file at this size (default: 5 MiB)")
+    parser.add_argument("--log-backups", type=int, default=5, help="rotated log files to keep (default: 5)")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="serve Prometheus metrics on 127.0.0.1:PORT/metrics (default: off)")
+    parser.add_argument("--metrics-textfile", metavar="PATH",
+                        help="periodically write Prometheus metrics to PATH for a textfile collector")
+    parser.add_argument("--metrics-interval", type=int, default=15,
+                        help="seconds between metrics textfile writes (default: 15)")
+    parser.add_argument("--control-port", type=int, default=0,
+                        help="serve the JSON control API on 127.0.0.1:PORT (default: off)")
+    parser.add_argument("--control-token", metavar="PATH",
+                        help="file with the control API's access token, created if missing "
+                             "(default: control-token in the settings folder)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log debug messages")
+    return parser
+
+
+def run_headless(args):
+    from .applog import setup_file_logging
+    from .dedup import OFF, DuplicateDetector
+    from .extract import ArchiveExtractor, NestedLimits
+    from .control import ControlServer, EventLog, load_token
+    from .governor import LimitsFile, ResourceGovernor
+    from .listings import ListingCache
+    from .members import MemberFilter
+    from .metrics import ExtractionMetrics, MetricsServer, TextfileWriter
+    from .monitor import FolderMonitor
+    from .processed_index import ProcessedIndex
+    from .readiness import ReadinessTracker
+    from .roots import WatchRoot, load_roots
+    from .scheduler import ExtractionScheduler
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s"
+    )
+    if args.log_file:
+        setup_file_logging(args.log_file, args.log_max_bytes, args.log_backups)
+
+    output = os.path.join(os.path.abspath(args.out), "{relpath}", "{stem}") if args.out else None
+    members = MemberFilter(args.include, args.exclude, int(args.min_member_size * 1024 * 1024),
+                           int(args.max_member_size * 1024 * 1024))
+    roots = [WatchRoot(folder, None, output, args.delete, args.recursive, not args.no_sniff, members)
+             for folder in args.watch or ()]
+    if args.roots:
+        roots.extend(load_roots(args.roots))
+
+    index = None
+    if not args.no_index:
+        index = ProcessedIndex(args.index)
+
+    nested = NestedLimits(args.nested_depth, args.nested_max_size * 1024 * 1024, args.nested_max_ratio)
+    dedup = None
+    if args.dedup != OFF:
+        if index is None:
+            log.warning("--dedup needs the processed index, ignoring it")
+        else:
+            dedup = DuplicateDetector(index, args.dedup)
+    governor = ResourceGovernor(int(args.max_write_rate * 1024 * 1024), args.job_threads, args.priority,
+                                args.schedule)
+    limits = LimitsFile(args.limits, governor) if args.limits else None
+    if limits is not None:
+        limits.poll()
+    listings = ListingCache(args.listings)
+    extractor = ArchiveExtractor(args.seven_zip, nested=nested, dedup=dedup, processes=args.zip_processes,
+                                 verify=not args.no_verify, governor=governor, listings=listings)
+    scheduler = ExtractionScheduler(extractor, args.workers, disk_reserve=args.disk_reserve * 1024 * 1024,
+                                    shortest_first=args.shortest_first)
+    if index is not None:
+        scheduler.add_listener(index.listener)
+
+    metrics = ExtractionMetrics(scheduler)
+    scheduler.add_listener(metrics.listener)
+    services = []
+    if args.metrics_port:
+        services.append(MetricsServer(metrics, args.metrics_port))
+    if args.metrics_textfile:
+        services.append(TextfileWriter(metrics, args.metrics_textfile, args.metrics_interval))
+
+    failures = []
+
+    def on_job_event(event, job):
+        if event == "finished":
+            log.info(f"Extraction {'completed' if job.success else 'failed'} for {job.archive}")
+            if job.success:
+                if index is not None:
+                    monitor.forget(job.archive)
+            else:
+                failures.append(job.archive)
+                if not args.once and monitor.follows_rules(job):
+                    monitor.retry_later(job.archive)
+
+    def on_new_file(file_path):
+        log.info(f"New file detected: {file_path}")
+        root = monitor.root_for(file_path)
+        scheduler.submit(file_path, root.output_path(file_path), root.delete, monitor.priority_for(file_path),
+                         monitor.volumes_for(file_path), root.members)
+
+    def submit_archive(archive, output=None, delete=None, priority=0, members=None):
+        if not os.path.isfile(archive):
+            raise ValueError(f"{archive} is not a file")
+        root = monitor.root_for(archive)
+        if output is None:
+            if root is None:
+                raise ValueError(f"{archive} isn't in a watched folder, an output path is needed")
+            output = root.output_path(archive)
+        if delete is None:
+            delete = root.delete if root is not None else False
+        if members is None and root is not None:
+            members = root.members
+        monitor.claim(archive)
+        return scheduler.submit(archive, output, bool(delete), priority, monitor.volumes_for(archive), members)
+
+    scheduler.add_listener(on_job_event)
+    monitor = FolderMonitor(roots, args.interval, on_new_file, args.watcher, index, metrics,
+                            ReadinessTracker(args.settle))
+    scheduler.add_listener(monitor.listener)
+    if args.control_port:
+        events = EventLog()
+        scheduler.add_listener(events.listener)
+        services.append(ControlServer(scheduler, submit_archive, events, args.control_port,
+                                       load_token(args.control_token)))
+    scheduler.start()
+    for service in services:
+        service.start()
+
+    try:
+        if args.once:
+            for file_path in monitor.scan_once():
+                on_new_file(file_path)
+            scheduler.wait_idle()
+            return 1 if failures else 0
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        monitor.start()
+        for root in roots:
+            log.info(f"Extracting archives from {root.folder} into {root.output}")
+        log.info(f"Using {scheduler.workers} workers, {governor.describe()}")
+        while not stop.wait(1.0):
+            if limits is not None:
+                limits.poll()
+        monitor.stop()
+        monitor.join()
+        return 0
+    finally:
+        scheduler.stop()
+        for service in services:
+            service.stop()
+        if index is not None:
+            index.close()
+        listings.close()
+
+
+def run_test(args):
+    from .extract import ArchiveExtractor, ExtractionError
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s"
+    )
+    extractor = ArchiveExtractor(args.seven_zip)
+    failed = 0
+    for archive in args.test:
+        try:
+            problems = extractor.test(archive)
+        except (ExtractionError, OSError) as e:
+            problems = [str(e)]
+        for problem in problems:
+            log.error(f"{archive}: {problem}")
+        log.info(f"{archive}: {'FAILED' if problems else 'OK'}")
+        failed += bool(problems)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.test:
+        return run_test(args)
+    if args.watch or args.roots:
+        return run_headless(args)
+
+    # Qt is only imported when the GUI is actually requested, so the headless
+    # mode works on machines without PyQt6 or a display.
+    from .gui import run_gui
+    return run_gui([sys.argv[0]])
@@ -0,0 +1,16 @@
+import os
+import sys
+
+APP_NAME = "AutoUnzip"
+
+
+def settings_dir():
+    # Same folder QSettings("AutoUnzip", ...) uses for its INI file on Linux
+    # and macOS, and the roaming AppData folder on Windows.
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~\\AppData\\Roaming")
+    else:
+        base = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    path = os.path.join(base, APP_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
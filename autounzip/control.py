@@ -0,0 +1,249 @@
+import collections
+import hmac
+import http.server
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from .config import settings_dir
+from .members import MemberFilter
+
+log = logging.getLogger(__name__)
+
+# How many past events and finished jobs the API still knows about.
+EVENT_HISTORY = 1000
+# Longest a request to /events waits for something to happen.
+MAX_WAIT = 60
+MAX_BODY_SIZE = 1024 * 1024
+MEMBER_KEYS = ("include", "exclude", "min_size", "max_size", "names")
+
+
+def default_token_path():
+    return os.path.join(settings_dir(), "control-token")
+
+
+def load_token(path=None):
+    # The secret every request has to present. It is created on first use,
+    # readable only by the user, so other users of the machine and web pages
+    # in a local browser can't queue jobs.
+    path = path or default_token_path()
+    try:
+        with open(path, encoding="utf-8") as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
+
+
+def job_to_dict(job):
+    progress = job.progress
+    return {
+        "id": job.id,
+        "archive": job.archive,
+        "volumes": job.volumes,
+        "output": job.extract_path,
+        "delete": job.delete_after,
+        "priority": job.priority,
+        "state": job.state,
+        "submitted_at": job.submitted_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error": None if job.error is None else str(job.error),
+        "members": job.members.to_dict() if job.members is not None and job.members.active else None,
+        "progress": None if progress is None else {
+            "percent": progress.percent,
+            "bytes_done": progress.bytes_done,
+            "bytes_total": progress.bytes_total,
+            "files_done": progress.files_done,
+        },
+    }
+
+
+class EventLog:
+    # Numbered record of the scheduler's recent events, for long polling.
+    # Add listener() to the scheduler. Progress events are left out; a job's
+    # progress shows in GET /jobs/<id>.
+
+    def __init__(self, size=EVENT_HISTORY):
+        self._events = collections.deque(maxlen=size)
+        self._finished = collections.OrderedDict()
+        self._size = size
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def listener(self, event, job):
+        if event == "progress":
+            return
+        with self._cond:
+            self._seq += 1
+            self._events.append({"seq": self._seq, "event": event, "time": time.time(),
+                                 "job": job_to_dict(job)})
+            if event in ("finished", "cancelled"):
+                self._finished[job.id] = job
+                while len(self._finished) > self._size:
+                    self._finished.popitem(last=False)
+            self._cond.notify_all()
+
+    def finished_job(self, job_id):
+        with self._cond:
+            return self._finished.get(job_id)
+
+    def since(self, seq, wait=0):
+        # Events numbered after seq, waiting up to wait seconds for the first
+        # one. Returns (events, number of the last event).
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > seq, timeout=wait)
+            return [e for e in self._events if e["seq"] > seq], self._seq
+
+
+class ControlServer:
+    # JSON API on localhost for scripts that hand archives over directly
+    # instead of dropping them into a watched folder and polling for the
+    # result:
+    #
+    #   GET    /jobs                     queued and running jobs
+    #   POST   /jobs                     {"archive", "output", "delete", "priority",
+    #                                     "include", "exclude", "min_size",
+    #                                     "max_size", "names"}
+    #   GET    /jobs/<id>                one job, including recently finished ones
+    #   DELETE /jobs/<id>                cancels a job that is still queued
+    #   GET    /events?after=N&wait=S    events after number N, waiting up to
+    #                                    S seconds for the first one
+    #
+    # Every request needs an "Authorization: Bearer <token>" header.
+    # submit(archive, output, delete, priority, members) queues a job and
+    # returns it; output, delete and members (a MemberFilter) are None when
+    # the request left them out, and it raises ValueError for archives it
+    # can't take.
+
+    def __init__(self, scheduler, submit, events, port, token, host="127.0.0.1"):
+        expected = f"Bearer {token}".encode()
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def _reply(self, status, data):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _error(self, status, message):
+                self._reply(status, {"error": message})
+
+            def _authorized(self):
+                if hmac.compare_digest(self.headers.get("Authorization", "").encode(), expected):
+                    return True
+                self._error(401, "missing or wrong token")
+                return False
+
+            def _job_id(self, path):
+                try:
+                    return int(path[len("/jobs/"):])
+                except ValueError:
+                    return None
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                url = urlsplit(self.path)
+                if url.path == "/jobs":
+                    self._reply(200, {
+                        "running": [job_to_dict(job) for job in scheduler.running_jobs()],
+                        "queued": [job_to_dict(job) for job in scheduler.queue.pending()],
+                    })
+                elif url.path.startswith("/jobs/"):
+                    job = self._find(self._job_id(url.path))
+                    if job is None:
+                        self._error(404, "no such job")
+                    else:
+                        self._reply(200, job_to_dict(job))
+                elif url.path == "/events":
+                    query = parse_qs(url.query)
+                    try:
+                        after = int(query.get("after", ["0"])[0])
+                        wait = min(float(query.get("wait", ["0"])[0]), MAX_WAIT)
+                    except ValueError:
+                        self._error(400, "after and wait must be numbers")
+                        return
+                    found, last = events.since(after, wait)
+                    self._reply(200, {"last": last, "events": found})
+                else:
+                    self._error(404, "not found")
+
+            def do_POST(self):
+                if not self._authorized():
+                    return
+                if urlsplit(self.path).path != "/jobs":
+                    self._error(404, "not found")
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    if length > MAX_BODY_SIZE:
+                        self._error(413, "request too large")
+                        return
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    archive = os.path.abspath(request["archive"])
+                    output = request.get("output")
+                    members = None
+                    if any(key in request for key in MEMBER_KEYS):
+                        members = MemberFilter.from_dict(request)
+                    job = submit(archive, os.path.abspath(output) if output else None, request.get("delete"),
+                                 int(request.get("priority", 0)), members)
+                except (KeyError, TypeError, AttributeError):
+                    self._error(400, "expected a JSON object with an archive path")
+                    return
+                except ValueError as e:
+                    self._error(400, str(e))
+                    return
+                log.info(f"Queued {archive} through the control API")
+                self._reply(201, job_to_dict(job))
+
+            def do_DELETE(self):
+                if not self._authorized():
+                    return
+                path = urlsplit(self.path).path
+                job = self._find(self._job_id(path)) if path.startswith("/jobs/") else None
+                if job is None:
+                    self._error(404, "no such job")
+                elif scheduler.cancel(job.id):
+                    self._reply(200, job_to_dict(job))
+                else:
+                    self._error(409, f"job is {job.state}, only queued jobs can be cancelled")
+
+            def _find(self, job_id):
+                if job_id is None:
+                    return None
+                for job in scheduler.running_jobs() + scheduler.queue.pending():
+                    if job.id == job_id:
+                        return job
+                return events.finished_job(job_id)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="control-http", daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        log.info(f"Serving the control API on http://127.0.0.1:{self.port}/")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,111 @@
+import errno
+import logging
+import os
+import shutil
+import sys
+
+from .processed_index import hash_file
+
+log = logging.getLogger(__name__)
+
+OFF = "off"
+SKIP = "skip"
+LINK = "link"
+MODES = (OFF, SKIP, LINK)
+
+# FICLONE from linux/fs.h: make dst share src's extents (copy-on-write).
+FICLONE = 0x40049409
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def reflink(src, dst):
+    # Clones src into dst on filesystems that support it (btrfs, XFS,
+    # bcachefs). Raises OSError everywhere else.
+    if fcntl is None or not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported on this platform")
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+class _Linker:
+    # Remembers which strategy worked so a tree of thousands of files doesn't
+    # retry a failing ioctl or cross-device link for every one of them.
+
+    def __init__(self):
+        self.strategies = [reflink, os.link, shutil.copy2]
+
+    def __call__(self, src, dst):
+        while len(self.strategies) > 1:
+            try:
+                return self.strategies[0](src, dst)
+            except OSError:
+                self.strategies.pop(0)
+        return self.strategies[0](src, dst)
+
+
+def link_tree(source, target):
+    # Recreates the tree under source at target without copying data where
+    # the filesystem allows: reflinks first, then hardlinks, then a copy.
+    # Returns the number of files materialised.
+    linker = _Linker()
+    count = 0
+    for folder, dirs, files in os.walk(source):
+        relative = os.path.relpath(folder, source)
+        destination = os.path.normpath(os.path.join(target, relative))
+        os.makedirs(destination, exist_ok=True)
+        for name in files:
+            dst = os.path.join(destination, name)
+            if os.path.lexists(dst):
+                os.remove(dst)
+            linker(os.path.join(folder, name), dst)
+            count += 1
+    return count
+
+
+class DuplicateDetector:
+    # Recognises archives whose content was extracted before by looking their
+    # SHA-256 up in the processed index. A duplicate is either skipped and
+    # pointed at the earlier output, or its output is materialised from the
+    # earlier one with reflinks/hardlinks instead of decompressing it again.
+
+    def __init__(self, index, mode=LINK):
+        self.index = index
+        self.mode = mode
+
+    def __call__(self, job):
+        # Returns True when job was satisfied from an earlier extraction.
+        if self.mode == OFF or len(job.volumes) > 1:
+            return False
+        try:
+            job.content_hash = hash_file(job.archive)
+        except OSError as e:
+            log.warning(f"Could not hash {job.archive}: {e}")
+            return False
+
+        previous = self.index.output_for_hash(job.content_hash)
+        if previous is None or not os.path.isdir(previous):
+            return False
+
+        if self.mode == SKIP or os.path.realpath(previous) == os.path.realpath(job.extract_path):
+            log.info(f"{job.archive} was already extracted to {previous}, skipping it")
+            job.extract_path = previous
+            return True
+
+        try:
+            count = link_tree(previous, job.extract_path)
+        except OSError as e:
+            log.warning(f"Could not reuse {previous} for {job.archive}, extracting it instead: {e}")
+            return False
+        log.info(f"{job.archive} was already extracted to {previous}, linked {count} files "
+                 f"into {job.extract_path}")
+        return True
@@ -0,0 +1,1114 @@
+import bz2
+import errno
+import gzip
+import heapq
+import io
+import logging
+import lzma
+import mmap
+import multiprocessing
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+import zlib
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+
+from .progress import Progress, run_with_progress
+from .sniff import DECOMPRESSION_ERRORS, detect_format, format_from_name
+from .staging import Staging
+from .verify import default_verify_workers, test_zip, verify_tree
+from .volumes import SPLIT, parse_volume
+
+log = logging.getLogger(__name__)
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Stored ZIP members are copied inside the kernel this much at a time, with
+# the CRC of each chunk checked as it goes.
+KERNEL_COPY_SIZE = 16 * 1024 * 1024
+# Files at least this large get their full size allocated before they are
+# written, so the filesystem can lay them out in one go.
+PREALLOCATE_MIN_BYTES = 1024 * 1024
+
+ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH")
+ZIP_LOCAL_SIGNATURE = b"PK\x03\x04"
+# Errors that mean a kernel copy method isn't available for this pair of
+# files, rather than that the copy failed.
+KERNEL_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP}
+
+# Nested ZIPs need random access, so they are buffered rather than streamed;
+# up to this size in memory, beyond it in an anonymous temporary file.
+NESTED_SPOOL_SIZE = 64 * 1024 * 1024
+
+LISTING_TIMEOUT = 60
+
+# ZIPs whose members add up to at least this much are decompressed by a pool
+# of processes when one is configured. Below it, starting the pool costs more
+# than it saves.
+PARALLEL_MIN_BYTES = 256 * 1024 * 1024
+# Batches per process. More, smaller batches keep the pool busy to the end
+# and let progress move as each one finishes.
+BATCHES_PER_PROCESS = 4
+
+# Small archives of highly repetitive data legitimately expand by large
+# factors, so the expansion ratio is only enforced past this many bytes.
+RATIO_GRACE_BYTES = 16 * 1024 * 1024
+
+DEFAULT_SEVEN_ZIP_PATH = r"C:\Program Files\7-Zip\7z.exe"
+
+SUPPORTED_EXTENSIONS = [".zip", ".rar", ".7z", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2",
+                        ".tar.xz", ".txz", ".tar.zst", ".tzst"]
+
+TAR_SUFFIXES = {
+    ".tar": "",
+    ".tar.gz": "gz",
+    ".tgz": "gz",
+    ".tar.bz2": "bz2",
+    ".tbz2": "bz2",
+    ".tar.xz": "xz",
+    ".txz": "xz",
+    ".tar.zst": "zst",
+    ".tzst": "zst",
+}
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# What reading a damaged or truncated archive raises, besides OSError.
+ARCHIVE_ERRORS = (zipfile.BadZipFile, tarfile.TarError, EOFError, zlib.error, lzma.LZMAError,
+                  gzip.BadGzipFile) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+class ExtractionError(Exception):
+    pass
+
+
+class UnsupportedArchive(ExtractionError):
+    pass
+
+
+class ArchiveBomb(ExtractionError):
+    pass
+
+
+class VerificationError(ExtractionError):
+    pass
+
+
+class ExtractionInterrupted(ExtractionError):
+    # Extraction stopped for a reason outside the archive; what was written
+    # is kept for the next attempt to resume.
+    pass
+
+
+class NestedLimits:
+    # Limits for expanding archives found inside archives. max_depth is how
+    # many levels are expanded (0 turns recursion off), max_bytes caps what
+    # nested archives may write for one job and max_ratio caps how far a
+    # nested archive may expand relative to its own size.
+
+    def __init__(self, max_depth=3, max_bytes=16 * 1024 ** 3, max_ratio=100):
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.max_ratio = max_ratio
+
+
+class _Nesting:
+    # Per-job bookkeeping for recursive extraction. pending holds
+    # (path, depth) of nested archives that were written out because the
+    # native engine can't stream them; they are expanded once the archive
+    # containing them is done.
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.written = 0
+        self.pending = []
+
+    def expands(self, name, depth):
+        if depth > self.limits.max_depth or parse_volume(os.path.basename(name)) is not None:
+            return False
+        return name.lower().endswith(tuple(SUPPORTED_EXTENSIONS))
+
+    def check(self, name, packed_size, unpacked_size, total):
+        if self.limits.max_bytes and total > self.limits.max_bytes:
+            raise ArchiveBomb(f"Nested archives exceed the {self.limits.max_bytes} byte limit at {name}")
+        if (unpacked_size > RATIO_GRACE_BYTES and packed_size
+                and unpacked_size > packed_size * self.limits.max_ratio):
+            raise ArchiveBomb(f"Nested archive {name} expands more than {self.limits.max_ratio}x its size")
+
+    def counter(self, name, packed_size):
+        # on_chunk callback charging what the nested archive name writes.
+        written = 0
+
+        def on_chunk(size):
+            nonlocal written
+            written += size
+            self.written += size
+            self.check(name, packed_size, written, self.written)
+        return on_chunk
+
+    def adopt(self, extract_path, archive, depth):
+        # Accounts for what an external tool extracted and queues the
+        # archives it left behind.
+        on_chunk = self.counter(archive, os.path.getsize(archive)) if depth else None
+        for folder, _, files in os.walk(extract_path):
+            for name in files:
+                path = os.path.join(folder, name)
+                if on_chunk is not None:
+                    on_chunk(os.path.getsize(path))
+                if self.expands(name, depth + 1):
+                    self.pending.append((path, depth + 1))
+
+
+class _CountingReader:
+    def __init__(self, raw, on_chunk):
+        self.raw = raw
+        self.on_chunk = on_chunk
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        if data:
+            self.on_chunk(len(data))
+        return data
+
+
+def find_seven_zip():
+    for name in ("7z", "7za", "7zz"):
+        path = shutil.which(name)
+        if path:
+            return path
+    if sys.platform == "win32" and os.path.exists(DEFAULT_SEVEN_ZIP_PATH):
+        return DEFAULT_SEVEN_ZIP_PATH
+    return None
+
+
+def archive_stem(path):
+    name = os.path.basename(path)
+    volume = parse_volume(name)
+    if volume is not None:
+        if volume[1] != SPLIT:
+            return volume[0]
+        name = volume[0]
+    lower = name.lower()
+    for suffix in TAR_SUFFIXES:
+        if lower.endswith(suffix):
+            return name[:-len(suffix)]
+    return os.path.splitext(name)[0]
+
+
+def safe_join(root, member_name):
+    target = os.path.realpath(os.path.join(root, member_name))
+    root = os.path.realpath(root)
+    if target != root and not target.startswith(root + os.sep):
+        raise ExtractionError(f"Refusing to extract {member_name!r} outside of {root}")
+    return target
+
+
+def _tar_compression(fmt):
+    if fmt == "tar":
+        return ""
+    if fmt is not None and fmt.startswith("tar."):
+        return fmt[4:]
+    return None
+
+
+def _zip_mtime(info):
+    return time.mktime(info.date_time + (0, 0, -1))
+
+
+def _balanced_batches(items, count):
+    # Splits (index, size) pairs into count batches of similar total size,
+    # largest first onto the lightest batch.
+    heap = [(0, i, []) for i in range(count)]
+    for index, size in sorted(items, key=lambda item: item[1], reverse=True):
+        total, i, batch = heapq.heappop(heap)
+        batch.append(index)
+        heapq.heappush(heap, (total + size, i, batch))
+    return [(total, batch) for total, _, batch in heap if batch]
+
+
+# The archive each pool process opened, so a batch doesn't re-read the
+# central directory.
+_worker_zip = None
+_worker_stored = None
+
+
+def _open_zip_worker(archive):
+    global _worker_zip, _worker_stored
+    _worker_zip = zipfile.ZipFile(archive)
+    _worker_stored = _StoredCopier(archive)
+
+
+def _extract_zip_batch(members):
+    # Runs in a pool process: decompresses (index, target) members straight
+    # to their destination through the process's own file handle.
+    infos = _worker_zip.infolist()
+    for index, target in members:
+        info = infos[index]
+        if info.compress_type == zipfile.ZIP_STORED:
+            _worker_stored.copy(info, target)
+        else:
+            with _worker_zip.open(info) as src:
+                _copy_stream(src, target, size=info.file_size)
+        mtime = _zip_mtime(info)
+        os.utime(target, (mtime, mtime))
+    return len(members)
+
+
+def _pool_context():
+    # Forking a process that runs GUI and scheduler threads can copy a held
+    # lock into the child, so processes are started fresh.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _preallocate(fd, size):
+    if size >= PREALLOCATE_MIN_BYTES and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass
+
+
+def _copy_stream(src, target, on_chunk=None, size=0, pace=None):
+    # size is what the archive says the member holds; the file is
+    # preallocated to it and trimmed again if less arrives. pace(n) is called
+    # after every write to hold the writer to a rate limit.
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb", buffering=0) as dst:
+        _preallocate(dst.fileno(), size)
+        written = 0
+        while True:
+            chunk = src.read(COPY_BUFFER_SIZE)
+            if not chunk:
+                break
+            dst.write(chunk)
+            written += len(chunk)
+            if on_chunk is not None:
+                on_chunk(len(chunk))
+            if pace is not None:
+                pace(len(chunk))
+        if written < size:
+            dst.truncate(written)
+
+
+def _write_listfile(names):
+    # One member path per line, for the @listfile argument of 7-Zip and
+    # unrar. The caller removes the file.
+    fd, path = tempfile.mkstemp(prefix="autounzip-", suffix=".lst")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write("".join(name + "\n" for name in names))
+    return path
+
+
+class _StoredCopier:
+    # Copies STORED ZIP members from their offset in the archive straight to
+    # the output with copy_file_range, or sendfile where that isn't possible,
+    # so the data never passes through Python. The CRC is computed over a
+    # read-only map of the same range as each chunk is copied, while it is
+    # still in the page cache.
+
+    def __init__(self, archive):
+        self.archive = archive
+        self._file = open(archive, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._methods = []
+        if hasattr(os, "copy_file_range"):
+            self._methods.append(self._copy_file_range)
+        if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+            self._methods.append(self._sendfile)
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _copy_file_range(self, out_fd, offset, count):
+        return os.copy_file_range(self._file.fileno(), out_fd, count, offset)
+
+    def _sendfile(self, out_fd, offset, count):
+        return os.sendfile(out_fd, self._file.fileno(), offset, count)
+
+    def _write(self, out_fd, offset, count):
+        return os.write(out_fd, self._view[offset:offset + count])
+
+    def _kernel_copy(self, out_fd, offset, count):
+        while self._methods:
+            try:
+                return self._methods[0](out_fd, offset, count)
+            except OSError as e:
+                if e.errno not in KERNEL_COPY_UNSUPPORTED:
+                    raise
+                self._methods.pop(0)
+        return self._write(out_fd, offset, count)
+
+    def data_offset(self, info):
+        offset = info.header_offset
+        header = self._view[offset:offset + ZIP_LOCAL_HEADER.size]
+        if len(header) < ZIP_LOCAL_HEADER.size:
+            raise ExtractionError(f"{self.archive} is truncated at {info.filename}")
+        signature, name_length, extra_length = ZIP_LOCAL_HEADER.unpack(header)
+        if signature != ZIP_LOCAL_SIGNATURE:
+            raise ExtractionError(f"{self.archive} has a bad local header for {info.filename}")
+        return offset + ZIP_LOCAL_HEADER.size + name_length + extra_length
+
+    def copy(self, info, target, on_chunk=None, pace=None):
+        start = self.data_offset(info)
+        end = start + info.compress_size
+        if end > len(self._map):
+            raise ExtractionError(f"{self.archive} is truncated at {info.filename}")
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        crc = 0
+        with open(target, "wb", buffering=0) as dst:
+            _preallocate(dst.fileno(), info.file_size)
+            offset = start
+            step = COPY_BUFFER_SIZE if pace is not None else KERNEL_COPY_SIZE
+            while offset < end:
+                count = self._kernel_copy(dst.fileno(), offset, min(step, end - offset))
+                if count <= 0:
+                    raise ExtractionError(f"{self.archive} ended early at {info.filename}")
+                crc = zlib.crc32(self._view[offset:offset + count], crc)
+                offset += count
+                if on_chunk is not None:
+                    on_chunk(count)
+                if pace is not None:
+                    pace(count)
+        if crc != info.CRC:
+            raise ExtractionError(f"Bad CRC-32 for {info.filename} in {self.archive}")
+
+
+class NativeExtractor:
+    # Extracts ZIP and tar archives in-process, streaming each entry straight
+    # to disk with large buffered writes. Backends are picked by format (see
+    # sniff.py) rather than by file name. With processes > 1, large ZIPs are
+    # split into size-balanced batches of members that a process pool
+    # decompresses side by side. A governor paces every write; while it
+    # limits the write rate the pool isn't used. A MemberFilter leaves out
+    # the members it doesn't match, along with their directories.
+    name = "native"
+
+    def __init__(self, processes=0, governor=None):
+        self.processes = processes
+        self.governor = governor
+        self.pace = governor.throttle if governor is not None else None
+
+    def _pool_size(self):
+        if self.governor is None:
+            return self.processes
+        if self.governor.limited():
+            return 0
+        return self.governor.threads(self.processes)
+
+    def can_extract(self, fmt):
+        if fmt == "zip":
+            return True
+        compression = _tar_compression(fmt)
+        if compression == "zst":
+            return zstandard is not None
+        return compression is not None
+
+    def plan(self, archive, fmt):
+        # (uncompressed size, entry count) from the ZIP central directory. A
+        # plain tarball is about as large as its contents; compressed ones
+        # would have to be decompressed to find out.
+        if fmt == "zip":
+            with zipfile.ZipFile(archive) as zf:
+                infos = zf.infolist()
+            return sum(info.file_size for info in infos), len(infos)
+        if fmt == "tar":
+            return os.path.getsize(archive), None
+        return None
+
+    def checksums(self, archive, fmt):
+        # (name, size, CRC-32) of every file in the archive. Tar records no
+        # checksums, so its members are listed with their size only, which
+        # means reading the tarball once more.
+        if fmt == "zip":
+            with zipfile.ZipFile(archive) as zf:
+                return [(i.filename, i.file_size, i.CRC) for i in zf.infolist() if not i.is_dir()]
+        with open(archive, "rb") as raw, self._open_tar(raw, _tar_compression(fmt)) as tar:
+            return [(m.name, m.size, None) for m in tar if m.isfile()]
+
+    def test(self, archive, fmt):
+        # Reads everything without writing output and returns the problems
+        # found. Compressed tarballs are covered by their stream checksum.
+        if fmt == "zip":
+            try:
+                return test_zip(archive)
+            except zipfile.BadZipFile as e:
+                return [str(e)]
+        try:
+            with open(archive, "rb") as raw, self._decompressor(raw, _tar_compression(fmt)) as stream:
+                with tarfile.open(fileobj=stream, mode="r|") as tar:
+                    for member in tar:
+                        if member.isfile():
+                            src = tar.extractfile(member)
+                            while src.read(COPY_BUFFER_SIZE):
+                                pass
+                # The stream's own checksum is only checked at its end, past
+                # the tar trailer.
+                while stream.read(COPY_BUFFER_SIZE):
+                    pass
+        except (tarfile.TarError,) + DECOMPRESSION_ERRORS as e:
+            return [str(e)]
+        return []
+
+    def extract(self, archive, extract_path, progress=None, fmt=None, nesting=None, depth=0, journal=None,
+                members=None):
+        # journal (see staging.py) lets an interrupted extraction skip the
+        # members it already wrote.
+        fmt = fmt or format_from_name(archive)
+        try:
+            if depth:
+                # A nested archive that had to be written out first.
+                with open(archive, "rb") as f:
+                    self._extract_nested(f, archive, fmt, os.path.getsize(archive), extract_path, nesting,
+                                         depth)
+            elif fmt == "zip":
+                self._extract_zip(archive, extract_path, progress, nesting, journal, members)
+            else:
+                self._extract_tar(archive, fmt, extract_path, progress, nesting, journal, members)
+        except ARCHIVE_ERRORS as e:
+            raise ExtractionError(f"{archive} is damaged: {e or type(e).__name__}")
+
+    def _extract_zip(self, archive, extract_path, progress=None, nesting=None, journal=None, members=None):
+        try:
+            zf = zipfile.ZipFile(archive)
+        except zipfile.BadZipFile as e:
+            raise ExtractionError(f"{archive} is not a valid ZIP file: {e}")
+
+        with zf:
+            infos = zf.infolist()
+            if members is not None:
+                infos = [info for info in infos if not info.is_dir() and members.matches(info.filename,
+                                                                                          info.file_size)]
+            state = Progress(bytes_total=sum(info.file_size for info in infos))
+
+            def on_chunk(size):
+                state.bytes_done += size
+                if state.bytes_total:
+                    state.percent = 100.0 * state.bytes_done / state.bytes_total
+                progress(state)
+
+            if self._pool_size() > 1 and state.bytes_total >= PARALLEL_MIN_BYTES:
+                self._zip_parallel(zf, archive, extract_path, on_chunk if progress else None, nesting, state,
+                                   journal, infos)
+            else:
+                with _StoredCopier(archive) as stored:
+                    self._zip_members(zf, archive, extract_path, on_chunk if progress else None, nesting, 0,
+                                      state, stored, journal, infos)
+
+        if progress is not None:
+            state.percent = 100
+            progress(state)
+
+    def _zip_members(self, zf, archive, extract_path, on_chunk, nesting, depth, state=None, stored=None,
+                     journal=None, infos=None):
+        # stored copies STORED members without going through zipfile; it is
+        # only given for archives that are files on disk. infos limits the
+        # members extracted.
+        for info in zf.infolist() if infos is None else infos:
+            if info.flag_bits & 0x1:
+                raise UnsupportedArchive(f"{archive} is encrypted")
+            target = safe_join(extract_path, info.filename)
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            if state is not None:
+                state.current_file = info.filename
+            if journal is not None and journal.has(info.filename, info.file_size, info.CRC, target):
+                if nesting is not None and nesting.expands(info.filename, depth + 1):
+                    nesting.pending.append((target, depth + 1))
+                if on_chunk is not None:
+                    on_chunk(info.file_size)
+                if state is not None:
+                    state.files_done += 1
+                continue
+            try:
+                if (stored is not None and info.compress_type == zipfile.ZIP_STORED
+                        and not (nesting is not None and nesting.expands(info.filename, depth + 1))):
+                    stored.copy(info, target, on_chunk, self.pace)
+                    written = True
+                else:
+                    with zf.open(info) as src:
+                        written = self._write_member(src, info.filename, info.file_size, target,
+                                                     on_chunk, nesting, depth)
+            except NotImplementedError as e:
+                raise UnsupportedArchive(str(e))
+            if written:
+                mtime = _zip_mtime(info)
+                os.utime(target, (mtime, mtime))
+                if journal is not None:
+                    journal.record(info.filename, info.file_size, info.CRC)
+            if state is not None:
+                state.files_done += 1
+
+    def _zip_parallel(self, zf, archive, extract_path, on_chunk, nesting, state, journal=None, infos=None):
+        # Directories and every target path are settled here first, so the
+        # pool processes only decompress and write. Nested archives are
+        # written out like any other member and expanded afterwards.
+        members = []
+        sizes = {}
+        selected = None if infos is None else {id(info) for info in infos}
+        for index, info in enumerate(zf.infolist()):
+            if selected is not None and id(info) not in selected:
+                continue
+            if info.flag_bits & 0x1:
+                raise UnsupportedArchive(f"{archive} is encrypted")
+            target = safe_join(extract_path, info.filename)
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            if nesting is not None and nesting.expands(info.filename, 1):
+                nesting.pending.append((target, 1))
+            if journal is not None and journal.has(info.filename, info.file_size, info.CRC, target):
+                state.files_done += 1
+                if on_chunk is not None:
+                    on_chunk(info.file_size)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            members.append((index, target))
+            sizes[index] = info.file_size
+        if not members:
+            return
+
+        targets = dict(members)
+        processes = min(self._pool_size(), len(members))
+        batches = _balanced_batches(sizes.items(), processes * BATCHES_PER_PROCESS)
+        log.info(f"Extracting {len(members)} entries of {archive} in {processes} processes")
+        pool = ProcessPoolExecutor(processes, mp_context=_pool_context(), initializer=_open_zip_worker,
+                                   initargs=(archive,))
+        try:
+            pending = {pool.submit(_extract_zip_batch, [(i, targets[i]) for i in batch]): (total, batch)
+                       for total, batch in batches}
+            infos = zf.infolist()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    total, batch = pending.pop(future)
+                    state.files_done += future.result()
+                    if journal is not None:
+                        for i in batch:
+                            journal.record(infos[i].filename, infos[i].file_size, infos[i].CRC)
+                    if on_chunk is not None:
+                        on_chunk(total)
+        except NotImplementedError as e:
+            raise UnsupportedArchive(str(e))
+        except (zipfile.BadZipFile, zlib.error) as e:
+            raise ExtractionError(f"{archive} is damaged: {e}")
+        except RuntimeError as e:
+            # BrokenProcessPool when a process died, e.g. killed for memory.
+            # The staging folder is kept, and the batches that finished are in
+            # the journal, so the next attempt only redoes the rest.
+            raise ExtractionInterrupted(f"The processes extracting {archive} failed: {e or type(e).__name__}")
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def _extract_tar(self, archive, fmt, extract_path, progress=None, nesting=None, journal=None, members=None):
+        # The uncompressed size of a streamed tarball isn't known up front,
+        # so bytes_total stays 0 until the end and the percentage follows the
+        # compressed bytes consumed. bytes_done counts what was written.
+        state = Progress()
+        packed_size = os.path.getsize(archive)
+        with open(archive, "rb") as raw:
+            def on_chunk(size):
+                state.bytes_done += size
+                if packed_size:
+                    state.percent = min(99.9, 100.0 * raw.tell() / packed_size)
+                progress(state)
+
+            with self._open_tar(raw, _tar_compression(fmt)) as tar:
+                self._tar_members(tar, archive, extract_path, on_chunk if progress else None, nesting, 0, state,
+                                  journal, members)
+
+        if progress is not None:
+            state.bytes_total = state.bytes_done
+            state.percent = 100
+            progress(state)
+
+    @staticmethod
+    def _decompressor(fileobj, compression):
+        # File objects that check the stream's checksum when read to the end,
+        # which tarfile's own stream mode doesn't do.
+        if compression == "gz":
+            return gzip.GzipFile(fileobj=fileobj)
+        if compression == "bz2":
+            return bz2.BZ2File(fileobj)
+        if compression == "xz":
+            return lzma.LZMAFile(fileobj)
+        if compression == "zst":
+            return zstandard.ZstdDecompressor().stream_reader(fileobj)
+        return fileobj
+
+    @staticmethod
+    def _open_tar(fileobj, compression):
+        if compression == "zst":
+            return tarfile.open(fileobj=zstandard.ZstdDecompressor().stream_reader(fileobj), mode="r|")
+        return tarfile.open(fileobj=fileobj, mode=f"r|{compression}")
+
+    def _tar_members(self, tar, archive, extract_path, on_chunk, nesting, depth, state=None, journal=None,
+                     members=None):
+        # Members the journal has, and those the filter leaves out, are still
+        # read past, as the tarball is a stream, but not written.
+        for member in tar:
+            if members is not None and not (member.isfile() and members.matches(member.name, member.size)):
+                continue
+            target = safe_join(extract_path, member.name)
+            if member.isdir():
+                os.makedirs(target, exist_ok=True)
+            elif member.isfile():
+                if state is not None:
+                    state.current_file = member.name
+                if journal is not None and journal.has(member.name, member.size, None, target):
+                    if nesting is not None and nesting.expands(member.name, depth + 1):
+                        nesting.pending.append((target, depth + 1))
+                elif self._write_member(tar.extractfile(member), member.name, member.size, target,
+                                        on_chunk, nesting, depth):
+                    os.utime(target, (member.mtime, member.mtime))
+                    if journal is not None:
+                        journal.record(member.name, member.size)
+                if state is not None:
+                    state.files_done += 1
+            elif hasattr(tarfile, "data_filter"):
+                tar.extract(member, extract_path, filter="data")
+            else:
+                log.warning(f"Skipping special entry {member.name} in {archive}")
+
+    def _write_member(self, src, name, size, target, on_chunk, nesting, depth):
+        # Writes one member to target, or expands it in place when it is a
+        # nested archive the native engine can read, streaming it straight
+        # from the outer archive. Returns whether target was written.
+        if nesting is None or not nesting.expands(name, depth + 1):
+            _copy_stream(src, target, on_chunk, size, self.pace)
+            return True
+        fmt = format_from_name(name)
+        if not self.can_extract(fmt):
+            _copy_stream(src, target, on_chunk, size, self.pace)
+            nesting.pending.append((target, depth + 1))
+            return True
+
+        log.info(f"Extracting nested archive {name}")
+        if depth == 0 and on_chunk is not None:
+            src = _CountingReader(src, on_chunk)
+        nested_path = os.path.join(os.path.dirname(target), archive_stem(target))
+        self._extract_nested(src, name, fmt, size, nested_path, nesting, depth + 1)
+        return False
+
+    def _extract_nested(self, src, archive, fmt, packed_size, extract_path, nesting, depth):
+        on_chunk = nesting.counter(archive, packed_size)
+        if fmt != "zip":
+            with self._open_tar(src, _tar_compression(fmt)) as tar:
+                self._tar_members(tar, archive, extract_path, on_chunk, nesting, depth)
+            return
+
+        spool = None
+        if not isinstance(src, io.BufferedReader):
+            spool = tempfile.SpooledTemporaryFile(NESTED_SPOOL_SIZE)
+            shutil.copyfileobj(src, spool, COPY_BUFFER_SIZE)
+            spool.seek(0)
+        try:
+            try:
+                zf = zipfile.ZipFile(spool or src)
+            except zipfile.BadZipFile as e:
+                raise ExtractionError(f"Nested archive {archive} is not a valid ZIP file: {e}")
+            with zf:
+                unpacked = sum(info.file_size for info in zf.infolist())
+                nesting.check(archive, packed_size, unpacked, nesting.written + unpacked)
+                self._zip_members(zf, archive, extract_path, on_chunk, nesting, depth)
+        finally:
+            if spool is not None:
+                spool.close()
+
+
+class SevenZipExtractor:
+    name = "7z"
+
+    def __init__(self, executable=None, governor=None):
+        self.executable = executable or find_seven_zip()
+        self.governor = governor
+
+    def can_extract(self, fmt):
+        return bool(self.executable) and fmt is not None
+
+    def _listing(self, archive):
+        # The technical listing, one dict of fields per file, which 7-Zip
+        # produces from the headers without decompressing anything.
+        process = subprocess.run([self.executable, "l", "-slt", archive], stdin=subprocess.DEVNULL,
+                                 capture_output=True, text=True, errors="replace", timeout=LISTING_TIMEOUT)
+        if process.returncode != 0:
+            return None
+        _, _, listing = process.stdout.partition("\n----------\n")
+        files = []
+        for block in listing.split("\n\n"):
+            fields = dict(line.split(" = ", 1) for line in block.splitlines() if " = " in line)
+            if "Path" not in fields or fields.get("Folder") == "+":
+                continue
+            files.append(fields)
+        return files
+
+    def plan(self, archive, fmt):
+        files = self._listing(archive)
+        if files is None:
+            return None
+        size = sum(int(f["Size"]) for f in files if f.get("Size", "").isdigit())
+        return size, len(files)
+
+    def checksums(self, archive, fmt):
+        files = self._listing(archive)
+        if files is None:
+            return None
+        return [(f["Path"], int(f.get("Size") or 0), int(f["CRC"], 16) if f.get("CRC") else None)
+                for f in files]
+
+    def test(self, archive, fmt):
+        returncode, stderr = run_with_progress([self.executable, "t", archive, "-y", "-bso0", "-bsp1", "-bse2"],
+                                               None, os.path.getsize(archive))
+        return [] if returncode == 0 else [stderr or f"7-Zip exited with code {returncode}"]
+
+    def extract(self, archive, extract_path, progress=None, names=None, unpacked_size=None):
+        # names limits extraction to these member paths. The percentage 7-Zip
+        # reports is turned into bytes written against unpacked_size, the
+        # expected output size, falling back to the archive's size.
+        os.makedirs(extract_path, exist_ok=True)
+        if names is not None and not names:
+            return
+        command = [self.executable, "x", archive, f"-o{extract_path}", "-y", "-bso0", "-bsp1", "-bse2"]
+        if self.governor is not None and self.governor.job_threads:
+            command.append(f"-mmt{self.governor.job_threads}")
+        listfile = None
+        if names is not None:
+            listfile = _write_listfile(names)
+            command += ["-spd", "-scsUTF-8", f"@{listfile}"]
+        try:
+            returncode, stderr = run_with_progress(command, progress, unpacked_size or os.path.getsize(archive),
+                                                   self.governor)
+        finally:
+            if listfile is not None:
+                os.remove(listfile)
+        if returncode != 0:
+            raise ExtractionError(stderr or f"7-Zip exited with code {returncode}")
+
+
+class UnrarExtractor:
+    name = "unrar"
+
+    def __init__(self, executable=None, governor=None):
+        self.executable = executable or shutil.which("unrar")
+        self.governor = governor
+
+    def can_extract(self, fmt):
+        return bool(self.executable) and fmt == "rar"
+
+    def plan(self, archive, fmt):
+        entries = self.checksums(archive, fmt)
+        if entries is None:
+            return None
+        return sum(size for _, size, _ in entries), len(entries)
+
+    def checksums(self, archive, fmt):
+        # From the technical listing. RAR5 archives may carry BLAKE2 hashes
+        # instead of CRC-32, and those files are checked by size.
+        process = subprocess.run([self.executable, "lt", archive], stdin=subprocess.DEVNULL,
+                                 capture_output=True, text=True, errors="replace", timeout=LISTING_TIMEOUT)
+        if process.returncode != 0:
+            return None
+        entries = []
+        for block in process.stdout.split("\n\n"):
+            fields = dict(line.strip().split(": ", 1) for line in block.splitlines() if ": " in line)
+            if "Name" not in fields or fields.get("Type") != "File":
+                continue
+            crc = fields.get("CRC32")
+            entries.append((fields["Name"], int(fields.get("Size") or 0), int(crc, 16) if crc else None))
+        return entries
+
+    def test(self, archive, fmt):
+        returncode, stderr = run_with_progress([self.executable, "t", "-y", archive], None,
+                                               os.path.getsize(archive))
+        return [] if returncode == 0 else [stderr or f"unrar exited with code {returncode}"]
+
+    def extract(self, archive, extract_path, progress=None, names=None, unpacked_size=None):
+        os.makedirs(extract_path, exist_ok=True)
+        if names is not None and not names:
+            return
+        command = [self.executable, "x", "-o+", "-y", archive, extract_path + os.sep]
+        if self.governor is not None and self.governor.job_threads:
+            command.insert(2, f"-mt{self.governor.job_threads}")
+        listfile = None
+        if names is not None:
+            listfile = _write_listfile(names)
+            command[-1:-1] = [f"@{listfile}"]
+            command.insert(2, "-scfl")
+        try:
+            returncode, stderr = run_with_progress(command, progress, unpacked_size or os.path.getsize(archive),
+                                                   self.governor)
+        finally:
+            if listfile is not None:
+                os.remove(listfile)
+        if returncode != 0:
+            raise ExtractionError(stderr or f"unrar exited with code {returncode}")
+
+
+class ArchiveExtractor:
+    # Tries each backend that claims the archive in order. The in-process
+    # engine comes first; external tools are only used for formats it can't
+    # handle. With verify set, the output of an archive that is to be
+    # deleted is checked against the CRCs in the archive first. A governor
+    # (see governor.py) limits the resources extraction may take. Archive
+    # listings are kept in listings (a ListingCache) when one is given.
+
+    def __init__(self, seven_zip_path=None, unrar_path=None, nested=None, dedup=None, processes=0,
+                 verify=True, governor=None, listings=None):
+        self.nested = nested
+        self.dedup = dedup
+        self.verify = verify
+        self.governor = governor
+        self.listings = listings
+        self.backends = [
+            NativeExtractor(processes, governor),
+            SevenZipExtractor(seven_zip_path, governor),
+            UnrarExtractor(unrar_path, governor),
+        ]
+
+    def backends_for(self, fmt, multivolume=False):
+        # The native engine reads single files only; volume sets go to the
+        # external tools, which follow the volumes from the first one.
+        return [b for b in self.backends
+                if b.can_extract(fmt) and not (multivolume and isinstance(b, NativeExtractor))]
+
+    @staticmethod
+    def format_of(archive, multivolume=False):
+        # The last volume of a split ZIP is the one extraction starts from and
+        # has no signature at its start, so volume sets also go by name.
+        fmt = detect_format(archive)
+        if fmt is None and multivolume:
+            fmt = format_from_name(archive)
+        return fmt
+
+    def extract(self, archive, extract_path, progress=None, multivolume=False, nesting=None, depth=0,
+                journal=None, members=None, volumes=None, unpacked_size=None):
+        # members (a MemberFilter) limits the members extracted. The native
+        # engine applies it as it reads the archive; the external tools are
+        # given the matching names from the archive's listing. They are also
+        # given unpacked_size, the planned output size, to measure progress
+        # and the write rate in bytes written.
+        fmt = self.format_of(archive, multivolume)
+        if fmt is None:
+            raise UnsupportedArchive(f"{archive} is not a recognised archive")
+        backends = self.backends_for(fmt, multivolume)
+        if not backends:
+            raise UnsupportedArchive(f"No extractor available for {archive}")
+
+        for backend in backends:
+            try:
+                os.makedirs(extract_path, exist_ok=True)
+                if isinstance(backend, NativeExtractor):
+                    backend.extract(archive, extract_path, progress, fmt, nesting, depth, journal, members)
+                elif members is not None:
+                    names = [name for name, _, _ in members.select(self.listing(archive, volumes))]
+                    backend.extract(archive, extract_path, progress, names, unpacked_size)
+                else:
+                    backend.extract(archive, extract_path, progress, unpacked_size=unpacked_size)
+                    if nesting is not None:
+                        nesting.adopt(extract_path, archive, depth)
+                return backend
+            except UnsupportedArchive as e:
+                log.info(f"{backend.name} extractor can't handle {archive} ({e}), trying the next one")
+        raise UnsupportedArchive(f"No extractor could handle {archive}")
+
+    def listing(self, archive, volumes=None):
+        # (name, size, CRC-32 or None) of every file in the archive, from the
+        # listing cache when it has the archive. Raises ExtractionError when
+        # it can't be listed.
+        volumes = volumes or [archive]
+        if self.listings is not None:
+            entries = self.listings.get(archive, volumes)
+            if entries is not None:
+                return entries
+        fmt = self.format_of(archive, len(volumes) > 1)
+        if fmt is None:
+            raise UnsupportedArchive(f"{archive} is not a recognised archive")
+        for backend in self.backends_for(fmt, len(volumes) > 1):
+            try:
+                entries = backend.checksums(archive, fmt)
+            except (zipfile.BadZipFile, tarfile.TarError, subprocess.SubprocessError) + DECOMPRESSION_ERRORS as e:
+                raise ExtractionError(f"Could not list {archive}: {e}")
+            if entries is not None:
+                break
+        else:
+            raise ExtractionError(f"Could not list {archive}")
+        if self.listings is not None:
+            self.listings.put(archive, entries, volumes)
+        return entries
+
+    def plan(self, job):
+        # Fills in the job's expected output size and entry count from the
+        # headers, using the backend that would extract it, or from the
+        # members a filter picks. Where that isn't possible the archive size
+        # stands in as a lower bound.
+        job.unpacked_size = sum(os.path.getsize(v) for v in job.volumes if os.path.exists(v))
+        members = job.members if job.members is not None and job.members.active else None
+        entries = self.listings.get(job.archive, job.volumes) if self.listings is not None else None
+        if entries is None and members is not None:
+            try:
+                entries = self.listing(job.archive, job.volumes)
+            except (ExtractionError, OSError) as e:
+                log.debug(f"Could not list {job.archive}: {e}")
+                return
+        if entries is not None:
+            if members is not None:
+                entries = members.select(entries)
+            job.unpacked_size, job.entries = sum(size for _, size, _ in entries), len(entries)
+            return
+        fmt = self.format_of(job.archive, len(job.volumes) > 1)
+        backends = self.backends_for(fmt, len(job.volumes) > 1)
+        if not backends:
+            return
+        try:
+            plan = backends[0].plan(job.archive, fmt)
+        except (OSError, zipfile.BadZipFile, subprocess.SubprocessError) as e:
+            log.debug(f"Could not read the size of {job.archive}: {e}")
+            return
+        if plan is not None:
+            job.unpacked_size, job.entries = plan
+
+    def check_output(self, archive, extract_path, volumes=None, nesting=None, members=None):
+        # Raises VerificationError unless every file the archive lists, or
+        # every one members picks, is in extract_path with the same size and
+        # CRC-32. Nested archives that were expanded in place are not
+        # expected on disk.
+        try:
+            entries = self.listing(archive, volumes)
+        except ExtractionError as e:
+            raise VerificationError(f"{e}, so the output can't be verified")
+        if members is not None:
+            entries = members.select(entries)
+        # A later entry with the same name is the one left on disk.
+        entries = list({name: (name, size, crc) for name, size, crc in entries}.values())
+        skip = None
+        if nesting is not None:
+            skip = lambda name: nesting.expands(name, 1)
+        workers = default_verify_workers()
+        if self.governor is not None:
+            workers = self.governor.threads(workers)
+        problems = verify_tree(extract_path, entries, workers, skip)
+        if problems:
+            for problem in problems[:10]:
+                log.error(f"Verification of {archive}: {problem}")
+            raise VerificationError(f"{len(problems)} of {len(entries)} files extracted from {archive} "
+                                    f"don't match the archive")
+        log.info(f"Verified {len(entries)} files extracted from {archive}")
+
+    def test(self, archive, multivolume=False):
+        # Tests the archive without writing anything and returns the
+        # problems found, an empty list when it is intact.
+        fmt = self.format_of(archive, multivolume)
+        if fmt is None:
+            raise UnsupportedArchive(f"{archive} is not a recognised archive")
+        backends = self.backends_for(fmt, multivolume)
+        if not backends:
+            raise UnsupportedArchive(f"No extractor available for {archive}")
+        log.info(f"Testing {archive} with the {backends[0].name} extractor")
+        return backends[0].test(archive, fmt)
+
+    def _expand_pending(self, nesting):
+        while nesting.pending:
+            path, depth = nesting.pending.pop()
+            if not self.backends_for(self.format_of(path)):
+                log.warning(f"No extractor available for nested archive {path}, leaving it as is")
+                continue
+            log.info(f"Extracting nested archive {path}")
+            self.extract(path, os.path.join(os.path.dirname(path), archive_stem(path)), nesting=nesting, depth=depth)
+            os.remove(path)
+
+    def __call__(self, job):
+        # Only whole archives are looked up as duplicates.
+        members = job.members if job.members is not None and job.members.active else None
+        nesting = None
+        if self.nested is not None and self.nested.max_depth > 0:
+            nesting = _Nesting(self.nested)
+        extract_path = job.extract_path
+        if members is None and self.dedup is not None and self.dedup(job):
+            # The earlier output may have changed since it was extracted, so
+            # before the archive is deleted what is there now has to match
+            # it. If it doesn't, the archive is extracted after all.
+            try:
+                if job.delete_after and self.verify:
+                    self.check_output(job.archive, job.extract_path, job.volumes, nesting)
+            except (ExtractionError, OSError) as e:
+                log.warning(f"Extracting {job.archive} again, the earlier output can't be reused: {e}")
+                job.extract_path = extract_path
+            else:
+                self._delete_volumes(job)
+                return True
+
+        log.info(f"Extracting: {job.archive} -> {job.extract_path}")
+        if members is not None:
+            log.info(f"Extracting only {members.describe()} of {job.archive}")
+        if self.governor is not None:
+            self.governor.apply_to_thread()
+        # Everything is written to a staging folder first, so extract_path
+        # only ever holds complete output. An interrupted run, whether the
+        # process exited or ExtractionInterrupted was raised, leaves the
+        # staging folder and its journal behind for the next attempt. Any
+        # other failure (a damaged archive, failed verification, a full disk
+        # or a bug) discards it, so a retry starts over.
+        staging = Staging(job.extract_path, job.volumes)
+        try:
+            staging.open()
+            backend = self.extract(job.archive, staging.path, job.report_progress, len(job.volumes) > 1,
+                                   nesting, journal=staging.journal, members=members, volumes=job.volumes,
+                                   unpacked_size=job.unpacked_size)
+            if nesting is not None:
+                self._expand_pending(nesting)
+            if job.delete_after and self.verify:
+                self.check_output(job.archive, staging.path, job.volumes, nesting, members)
+            staging.publish()
+        except ExtractionInterrupted as e:
+            log.error(f"Extraction of {job.archive} was interrupted, keeping what was written: {e}")
+            job.error = e
+            staging.close()
+            return False
+        except (ExtractionError, OSError) as e:
+            log.error(f"Error extracting {job.archive}: {e}")
+            job.error = e
+            staging.discard()
+            return False
+        except Exception as e:
+            log.exception(f"Unexpected error extracting {job.archive}")
+            job.error = e
+            staging.discard()
+            return False
+
+        log.debug(f"Extracted {job.archive} with the {backend.name} extractor")
+        if members is not None:
+            # The rest of the archive is still only in the archive.
+            if job.delete_after:
+                log.info(f"Keeping {job.archive}, only part of it was extracted")
+            return True
+        self._delete_volumes(job)
+        return True
+
+    @staticmethod
+    def _delete_volumes(job):
+        if job.delete_after:
+            for volume in job.volumes:
+                os.remove(volume)
+                log.info(f"Deleted original file: {volume}")
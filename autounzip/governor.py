@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+NORMAL = "normal"
+LOW = "low"
+IDLE = "idle"
+PRIORITIES = (NORMAL, LOW, IDLE)
+
+NICENESS = {NORMAL: 0, LOW: 10, IDLE: 19}
+IONICE_ARGS = {NORMAL: ["-c", "2", "-n", "4"], LOW: ["-c", "2", "-n", "7"], IDLE: ["-c", "3"]}
+WINDOWS_PRIORITY_CLASS = {LOW: "BELOW_NORMAL_PRIORITY_CLASS", IDLE: "IDLE_PRIORITY_CLASS"}
+
+# How far ahead of the rate a writer may get before it has to wait.
+BURST_SECONDS = 0.5
+
+
+def parse_schedule(text):
+    # "22:00-07:00=0,12:00-13:00=50" -> [(start_minute, end_minute, bytes per
+    # second)]. Rates are in MB/s and 0 means unlimited; windows may wrap
+    # past midnight.
+    windows = []
+    for part in filter(None, (p.strip() for p in (text or "").split(","))):
+        try:
+            span, rate = part.split("=")
+            start, end = (_minutes(t) for t in span.split("-"))
+            windows.append((start, end, int(float(rate) * 1024 * 1024)))
+        except ValueError:
+            raise ValueError(f"Invalid schedule entry {part!r}, expected HH:MM-HH:MM=MB/s")
+    return windows
+
+
+def format_schedule(windows):
+    return ",".join(f"{_clock(start)}-{_clock(end)}={rate / 1024 / 1024:g}" for start, end, rate in windows)
+
+
+def _minutes(clock):
+    hours, minutes = clock.strip().split(":")
+    value = int(hours) * 60 + int(minutes)
+    if not 0 <= value <= 24 * 60:
+        raise ValueError(clock)
+    return value
+
+
+def _clock(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class TokenBucket:
+    # Write-rate limiter in bytes per second, 0 meaning unlimited. Writers
+    # may run into debt; reserve() books their bytes and says how long to
+    # wait before writing more.
+
+    def __init__(self, rate=0):
+        self.rate = rate
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self._lock:
+            if rate != self.rate:
+                self.rate = rate
+                self._tokens = 0.0
+                self._last = time.monotonic()
+
+    def reserve(self, nbytes):
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(self.rate * BURST_SECONDS, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= nbytes
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class ResourceGovernor:
+    # Keeps background extraction from starving the machine. write_rate caps
+    # what all jobs together write per second, job_threads caps the threads
+    # or processes one job may use (0 leaves it to the engine), priority
+    # lowers CPU and I/O priority of extraction, and schedule windows
+    # override write_rate at certain times of day. Everything can be changed
+    # while jobs run with configure().
+
+    def __init__(self, write_rate=0, job_threads=0, priority=NORMAL, schedule=None):
+        self.write_rate = write_rate
+        self.job_threads = job_threads
+        self.priority = priority
+        self.schedule = list(schedule or ())
+        self.bucket = TokenBucket(write_rate)
+        self._local = threading.local()
+
+    def configure(self, write_rate=None, job_threads=None, priority=None, schedule=None):
+        if write_rate is not None:
+            self.write_rate = write_rate
+        if job_threads is not None:
+            self.job_threads = job_threads
+        if priority is not None:
+            self.priority = priority
+        if schedule is not None:
+            self.schedule = list(schedule)
+        log.info(f"Extraction limits: {self.describe()}")
+
+    def describe(self):
+        rate = f"{self.write_rate / 1024 / 1024:g} MB/s" if self.write_rate else "unlimited"
+        parts = [f"write rate {rate}", f"priority {self.priority}"]
+        if self.job_threads:
+            parts.append(f"{self.job_threads} threads per job")
+        if self.schedule:
+            parts.append(f"schedule {format_schedule(self.schedule)}")
+        return ", ".join(parts)
+
+    def to_dict(self):
+        return {"write_rate_mb": self.write_rate / 1024 / 1024, "job_threads": self.job_threads,
+                "priority": self.priority, "schedule": format_schedule(self.schedule)}
+
+    def update(self, data):
+        # Applies a dict in the to_dict() format; keys that are missing are
+        # left alone.
+        self.configure(
+            write_rate=int(float(data["write_rate_mb"]) * 1024 * 1024) if "write_rate_mb" in data else None,
+            job_threads=int(data["job_threads"]) if "job_threads" in data else None,
+            priority=data["priority"] if data.get("priority") in PRIORITIES else None,
+            schedule=parse_schedule(data["schedule"]) if "schedule" in data else None,
+        )
+
+    def current_rate(self, now=None):
+        local = time.localtime(now)
+        minute = local.tm_hour * 60 + local.tm_min
+        for start, end, rate in self.schedule:
+            inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+            if inside:
+                return rate
+        return self.write_rate
+
+    def limited(self):
+        return self.current_rate() > 0
+
+    def threads(self, default):
+        return min(default, self.job_threads) if self.job_threads else default
+
+    def throttle(self, nbytes):
+        # Called by in-process writers after writing nbytes.
+        self.bucket.set_rate(self.current_rate())
+        delay = self.bucket.reserve(nbytes)
+        if delay:
+            time.sleep(delay)
+
+    def pace(self, process, nbytes):
+        # Holds an external tool back by stopping it until its last nbytes
+        # fit into the rate. Where processes can't be stopped only the
+        # progress reading waits.
+        self.bucket.set_rate(self.current_rate())
+        delay = self.bucket.reserve(nbytes)
+        if not delay:
+            return
+        stop = getattr(signal, "SIGSTOP", None)
+        if stop is None:
+            time.sleep(delay)
+            return
+        try:
+            process.send_signal(stop)
+            time.sleep(delay)
+        finally:
+            process.send_signal(signal.SIGCONT)
+
+    def apply_to_thread(self):
+        # Sets the calling worker thread's CPU and I/O priority. On Linux both
+        # are per thread and inherited by the tools it starts.
+        priority = self.priority
+        if getattr(self._local, "priority", NORMAL) == priority:
+            return
+        self._local.priority = priority
+        if not sys.platform.startswith("linux"):
+            return
+        tid = threading.get_native_id()
+        try:
+            os.setpriority(os.PRIO_PROCESS, tid, NICENESS[priority])
+        except OSError as e:
+            # Raising the priority again needs privileges.
+            log.debug(f"Could not set the CPU priority of the extraction thread: {e}")
+        ionice = shutil.which("ionice")
+        if ionice:
+            subprocess.run([ionice, *IONICE_ARGS[priority], "-p", str(tid)], stdin=subprocess.DEVNULL,
+                           capture_output=True)
+
+    def command(self, command):
+        # Where priorities aren't inherited from the worker thread, external
+        # tools are started through nice.
+        niceness = NICENESS[self.priority]
+        if niceness and os.name == "posix" and not sys.platform.startswith("linux") and shutil.which("nice"):
+            return ["nice", "-n", str(niceness)] + list(command)
+        return command
+
+    def creationflags(self):
+        name = WINDOWS_PRIORITY_CLASS.get(self.priority)
+        return getattr(subprocess, name, 0) if name else 0
+
+
+class LimitsFile:
+    # Applies a JSON file in the to_dict() format to a governor whenever the
+    # file changes, so the limits of a headless instance can be changed while
+    # it runs.
+
+    def __init__(self, path, governor):
+        self.path = path
+        self.governor = governor
+        self._mtime = None
+
+    def poll(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.governor.update(json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            log.warning(f"Could not apply the limits in {self.path}: {e}")
+        return True
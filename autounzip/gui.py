@@ -0,0 +1,1219 @@
+import json
+import logging
+import os
+import sys
+import threading
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QPushButton, QVBoxLayout, QHBoxLayout, 
+                            QWidget, QLabel, QFileDialog, QCheckBox, QListWidget, QListWidgetItem,
+                            QSpinBox, QLineEdit, QGroupBox, QFormLayout, QSystemTrayIcon, QMenu,
+                            QGridLayout, QTabWidget, QTextBrowser, QComboBox, QPlainTextEdit, QTableWidget,
+                            QTableWidgetItem, QHeaderView, QDialog)
+from PyQt6.QtCore import Qt, QObject, pyqtSignal, QSettings, QTimer, QEvent
+from PyQt6.QtGui import QIcon, QAction, QFont, QColor, QPalette, QDesktopServices
+from PyQt6.QtCore import QUrl
+
+from .applog import DEFAULT_MAX_LINES, RingBufferHandler, setup_file_logging
+from .control import ControlServer, EventLog, load_token
+from .dedup import MODES as DEDUP_MODES, DuplicateDetector
+from .extract import (SUPPORTED_EXTENSIONS, ArchiveExtractor, ExtractionError, NestedLimits, archive_stem,
+                      find_seven_zip)
+from .governor import PRIORITIES, ResourceGovernor, format_schedule, parse_schedule
+from .listings import ListingCache
+from .members import MemberFilter
+from .metrics import ExtractionMetrics, MetricsServer
+from .monitor import FolderMonitor
+from .processed_index import ProcessedIndex
+from .readiness import ReadinessTracker
+from .roots import WatchRoot
+from .scheduler import ExtractionScheduler, default_worker_count
+from .watcher import BACKENDS as WATCHER_BACKENDS
+
+log = logging.getLogger("autounzip")
+
+ICON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "icons", "icon.ico")
+
+def format_size(num_bytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TB"
+
+class SchedulerSignals(QObject):
+    job_event = pyqtSignal(str, object)
+
+class MonitorSignals(QObject):
+    new_file_found = pyqtSignal(str)
+
+class ContentsSignals(QObject):
+    listing_ready = pyqtSignal(str, object)
+
+class ArchiveContentsDialog(QDialog):
+    # Shows the members of an archive from its listing. Typing globs narrows
+    # the list down; ticked members can be extracted on their own with
+    # extract(names, destination).
+    def __init__(self, archive, entries, extract, parent=None):
+        super().__init__(parent)
+        self.extract = extract
+        self.setWindowTitle(f"Archive Contents - {os.path.basename(archive)}")
+        self.resize(700, 500)
+        layout = QVBoxLayout(self)
+        
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Show only members matching, e.g. *.csv, data/*")
+        self.filter_edit.textChanged.connect(self.apply_filter)
+        layout.addWidget(self.filter_edit)
+        
+        self.table = QTableWidget(len(entries), 2)
+        self.table.setHorizontalHeaderLabels(["Name", "Size"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        for row, (name, size, _) in enumerate(entries):
+            item = QTableWidgetItem(name)
+            item.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
+            item.setCheckState(Qt.CheckState.Unchecked)
+            item.setData(Qt.ItemDataRole.UserRole, size)
+            self.table.setItem(row, 0, item)
+            self.table.setItem(row, 1, QTableWidgetItem(format_size(size)))
+        layout.addWidget(self.table)
+        
+        total = sum(size for _, size, _ in entries)
+        layout.addWidget(QLabel(f"{len(entries)} files, {format_size(total)} uncompressed"))
+        
+        buttons_layout = QHBoxLayout()
+        tick_button = QPushButton("Tick Shown")
+        tick_button.clicked.connect(lambda: self.set_shown_checked(Qt.CheckState.Checked))
+        untick_button = QPushButton("Untick Shown")
+        untick_button.clicked.connect(lambda: self.set_shown_checked(Qt.CheckState.Unchecked))
+        extract_button = QPushButton("Extract Ticked...")
+        extract_button.clicked.connect(self.extract_ticked)
+        buttons_layout.addWidget(tick_button)
+        buttons_layout.addWidget(untick_button)
+        buttons_layout.addWidget(extract_button)
+        layout.addLayout(buttons_layout)
+    
+    def apply_filter(self, text):
+        members = MemberFilter(text.split(","))
+        for row in range(self.table.rowCount()):
+            item = self.table.item(row, 0)
+            shown = members.matches(item.text(), item.data(Qt.ItemDataRole.UserRole))
+            self.table.setRowHidden(row, not shown)
+    
+    def set_shown_checked(self, state):
+        for row in range(self.table.rowCount()):
+            if not self.table.isRowHidden(row):
+                self.table.item(row, 0).setCheckState(state)
+    
+    def extract_ticked(self):
+        names = [self.table.item(row, 0).text() for row in range(self.table.rowCount())
+                 if self.table.item(row, 0).checkState() == Qt.CheckState.Checked]
+        if not names:
+            return
+        destination = QFileDialog.getExistingDirectory(self, "Extract To")
+        if destination:
+            self.extract(names, destination)
+            self.accept()
+
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        
+        self.settings = QSettings("AutoUnzip", "Settings")
+        
+        self.downloads_folder = self.settings.value("downloads_folder", os.path.expanduser("~\\Downloads"))
+        self.extract_folder = self.settings.value("extract_folder", os.path.join(self.downloads_folder, "Extracted"))
+        self.auto_delete = self.settings.value("auto_delete", "false") == "true"
+        self.verify_before_delete = self.settings.value("verify_before_delete", "true") == "true"
+        self.monitor_interval = int(self.settings.value("monitor_interval", 10))
+        self.auto_start_monitoring = self.settings.value("auto_start_monitoring", "false") == "true"
+        self.dark_mode = self.settings.value("dark_mode", "false") == "true"
+        self.max_workers = int(self.settings.value("max_workers", default_worker_count()))
+        self.watcher_backend = self.settings.value("watcher_backend", "auto")
+        self.index_retention_days = int(self.settings.value("index_retention_days", 90))
+        self.hash_archives = self.settings.value("hash_archives", "false") == "true"
+        self.log_max_lines = int(self.settings.value("log_max_lines", DEFAULT_MAX_LINES))
+        self.log_file_max_mb = int(self.settings.value("log_file_max_mb", 5))
+        self.metrics_port = int(self.settings.value("metrics_port", 0))
+        self.control_port = int(self.settings.value("control_port", 0))
+        self.settle_seconds = int(self.settings.value("settle_seconds", 2))
+        self.zip_processes = int(self.settings.value("zip_processes", 0))
+        self.nested_depth = int(self.settings.value("nested_depth", 0))
+        self.nested_max_gb = int(self.settings.value("nested_max_gb", 16))
+        self.dedup_mode = self.settings.value("dedup_mode", "off")
+        self.disk_reserve_gb = int(self.settings.value("disk_reserve_gb", 1))
+        self.write_rate_mb = int(self.settings.value("write_rate_mb", 0))
+        self.job_threads = int(self.settings.value("job_threads", 0))
+        self.extract_priority = self.settings.value("extract_priority", "normal")
+        try:
+            speed_schedule = parse_schedule(self.settings.value("speed_schedule", ""))
+        except ValueError:
+            speed_schedule = []
+        self.governor = ResourceGovernor(self.write_rate_mb * 1024 * 1024, self.job_threads,
+                                         self.extract_priority, speed_schedule)
+        self.shortest_first = self.settings.value("shortest_first", "false") == "true"
+        self.watch_subfolders = self.settings.value("watch_subfolders", "false") == "true"
+        self.sniff_content = self.settings.value("sniff_content", "true") == "true"
+        self.extra_roots = [WatchRoot.from_dict(d) for d in json.loads(self.settings.value("watch_roots", "[]"))]
+        
+        self.seven_zip_path = self.settings.value("seven_zip_path", find_seven_zip() or "")
+        
+        self.supported_extensions = SUPPORTED_EXTENSIONS
+        
+        # Set application and window icons
+        self.setWindowIcon(QIcon(ICON_PATH))
+        app = QApplication.instance()
+        app.setWindowIcon(QIcon(ICON_PATH))
+        
+        self.log_handler = RingBufferHandler(self.log_max_lines)
+        self.log_file_handler = setup_file_logging(max_bytes=self.log_file_max_mb * 1024 * 1024)
+        log.addHandler(self.log_handler)
+        log.setLevel(logging.INFO)
+        
+        self.setup_ui()
+        self.setup_system_tray()
+        
+        self.log_flush_timer = QTimer(self)
+        self.log_flush_timer.setInterval(200)
+        self.log_flush_timer.timeout.connect(self.flush_log)
+        self.log_flush_timer.start()
+        
+        self.monitor = None
+        self.monitor_signals = MonitorSignals()
+        self.monitor_signals.new_file_found.connect(self.handle_new_file)
+        
+        self.index = ProcessedIndex(retention_days=self.index_retention_days, use_hash=self.hash_archives)
+        self.listings = ListingCache()
+        self.contents_signals = ContentsSignals()
+        self.contents_signals.listing_ready.connect(self.open_archive_contents)
+        
+        self.scheduler_signals = SchedulerSignals()
+        self.scheduler_signals.job_event.connect(self.handle_job_event)
+        self.scheduler = ExtractionScheduler(self.create_extractor(), self.max_workers,
+                                             disk_reserve=self.disk_reserve_gb * 1024 ** 3,
+                                             shortest_first=self.shortest_first)
+        self.scheduler.add_listener(self.index.listener)
+        self.metrics = ExtractionMetrics(self.scheduler)
+        self.scheduler.add_listener(self.metrics.listener)
+        self.scheduler.add_listener(self.scheduler_signals.job_event.emit)
+        self.events = EventLog()
+        self.scheduler.add_listener(self.events.listener)
+        self.scheduler.start()
+        
+        self.queue_refresh_timer = QTimer(self)
+        self.queue_refresh_timer.setSingleShot(True)
+        self.queue_refresh_timer.setInterval(250)
+        self.queue_refresh_timer.timeout.connect(self.refresh_queue_view)
+        
+        self.metrics_server = None
+        self.apply_metrics_port()
+        self.control_server = None
+        self.apply_control_port()
+        
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(2000)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+        self.stats_timer.start()
+        
+        self.apply_theme()
+        self.add_log("Application started")
+        
+        if self.auto_start_monitoring:
+            QTimer.singleShot(1000, self.start_monitoring)
+    
+    def watch_roots(self):
+        output = os.path.join(self.extract_folder, "{relpath}", "{stem}")
+        main_root = WatchRoot(self.downloads_folder, self.supported_extensions, output, self.auto_delete,
+                              self.watch_subfolders, self.sniff_content)
+        return [main_root] + self.extra_roots
+    
+    def add_root_row(self, root):
+        row = self.roots_table.rowCount()
+        self.roots_table.insertRow(row)
+        self.roots_table.setItem(row, 0, QTableWidgetItem(root.folder))
+        self.roots_table.setItem(row, 1, QTableWidgetItem(", ".join(root.patterns)))
+        self.roots_table.setItem(row, 2, QTableWidgetItem(root.output))
+        for column, checked in ((3, root.delete), (4, root.recursive), (5, root.sniff)):
+            item = QTableWidgetItem()
+            item.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
+            item.setCheckState(Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked)
+            self.roots_table.setItem(row, column, item)
+        members = root.members
+        self.roots_table.setItem(row, 6, QTableWidgetItem(", ".join(members.include)))
+        self.roots_table.setItem(row, 7, QTableWidgetItem(", ".join(members.exclude)))
+        for column, size in ((8, members.min_size), (9, members.max_size)):
+            self.roots_table.setItem(row, column, QTableWidgetItem(f"{size / 1024 / 1024:g}" if size else ""))
+    
+    def add_root(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder")
+        if folder:
+            self.add_root_row(WatchRoot(folder, output=os.path.join(self.extract_folder, "{stem}")))
+    
+    def roots_from_table(self):
+        roots = []
+        for row in range(self.roots_table.rowCount()):
+            folder = self.roots_table.item(row, 0).text().strip()
+            if not folder:
+                continue
+            patterns = [p.strip() for p in self.roots_table.item(row, 1).text().split(",") if p.strip()]
+            sizes = []
+            for column in (8, 9):
+                try:
+                    sizes.append(int(float(self.roots_table.item(row, column).text() or 0) * 1024 * 1024))
+                except ValueError:
+                    sizes.append(0)
+            members = MemberFilter(self.roots_table.item(row, 6).text().split(","),
+                                   self.roots_table.item(row, 7).text().split(","), *sizes)
+            roots.append(WatchRoot(folder, patterns, self.roots_table.item(row, 2).text().strip() or None,
+                                   self.roots_table.item(row, 3).checkState() == Qt.CheckState.Checked,
+                                   self.roots_table.item(row, 4).checkState() == Qt.CheckState.Checked,
+                                   self.roots_table.item(row, 5).checkState() == Qt.CheckState.Checked,
+                                   members))
+        return roots
+    
+    def create_extractor(self):
+        nested = NestedLimits(self.nested_depth, self.nested_max_gb * 1024 ** 3)
+        return ArchiveExtractor(self.seven_zip_path or None, nested=nested,
+                                dedup=DuplicateDetector(self.index, self.dedup_mode), processes=self.zip_processes,
+                                verify=self.verify_before_delete, governor=self.governor, listings=self.listings)
+    
+    def apply_theme(self):
+        app = QApplication.instance()
+        app.setStyle("Fusion")
+        
+        if self.dark_mode:
+            dark_palette = QPalette()
+            dark_color = QColor(45, 45, 45)
+            disabled_color = QColor(127, 127, 127)
+            text_color = QColor(210, 210, 210)
+            highlight_color = QColor(42, 130, 218)
+            
+            dark_palette.setColor(QPalette.ColorRole.Window, dark_color)
+            dark_palette.setColor(QPalette.ColorRole.WindowText, text_color)
+            dark_palette.setColor(QPalette.ColorRole.Base, QColor(18, 18, 18))
+            dark_palette.setColor(QPalette.ColorRole.AlternateBase, QColor(53, 53, 53))
+            dark_palette.setColor(QPalette.ColorRole.ToolTipBase, dark_color)
+            dark_palette.setColor(QPalette.ColorRole.ToolTipText, text_color)
+            dark_palette.setColor(QPalette.ColorRole.Text, text_color)
+            dark_palette.setColor(QPalette.ColorRole.Button, dark_color)
+            dark_palette.setColor(QPalette.ColorRole.ButtonText, text_color)
+            dark_palette.setColor(QPalette.ColorRole.BrightText, Qt.GlobalColor.red)
+            dark_palette.setColor(QPalette.ColorRole.Link, QColor(42, 130, 218))
+            dark_palette.setColor(QPalette.ColorRole.Highlight, highlight_color)
+            dark_palette.setColor(QPalette.ColorRole.HighlightedText, Qt.GlobalColor.black)
+            dark_palette.setColor(QPalette.ColorGroup.Disabled, QPalette.ColorRole.Text, disabled_color)
+            dark_palette.setColor(QPalette.ColorGroup.Disabled, QPalette.ColorRole.ButtonText, disabled_color)
+            
+            app.setPalette(dark_palette)
+            
+            button_style = """
+                QPushButton {
+                    border: 1px solid #555555;
+                    border-radius: 4px;
+                    padding: 6px 12px;
+                    background-color: #444444;
+                    color: #E0E0E0;
+                }
+                QPushButton:hover {
+                    background-color: #555555;
+                }
+                QPushButton:pressed {
+                    background-color: #666666;
+                }
+                QPushButton:disabled {
+                    background-color: #333333;
+                    color: #777777;
+                }
+            """
+            
+            self.start_button.setStyleSheet("""
+                QPushButton {
+                    border: 1px solid #2e7d32;
+                    border-radius: 4px;
+                    padding: 6px 12px;
+                    background-color: #43a047;
+                    color: white;
+                }
+                QPushButton:hover {
+                    background-color: #388e3c;
+                }
+                QPushButton:pressed {
+                    background-color: #2e7d32;
+                }
+                QPushButton:disabled {
+                    background-color: #388e3c;
+                    color: #dddddd;
+                }
+            """)
+            
+            self.stop_button.setStyleSheet("""
+                QPushButton {
+                    border: 1px solid #c62828;
+                    border-radius: 4px;
+                    padding: 6px 12px;
+                    background-color: #d32f2f;
+                    color: white;
+                }
+                QPushButton:hover {
+                    background-color: #c62828;
+                }
+                QPushButton:pressed {
+                    background-color: #b71c1c;
+                }
+                QPushButton:disabled {
+                    background-color: #c62828;
+                    color: #dddddd;
+                }
+            """)
+            
+            groupbox_style = """
+                QGroupBox {
+                    border: 1px solid #555555;
+                    border-radius: 4px;
+                    margin-top: 1.5ex;
+                    font-weight: bold;
+                }
+                QGroupBox::title {
+                    subcontrol-origin: margin;
+                    subcontrol-position: top center;
+                    padding: 0 5px;
+                    color: #E0E0E0;
+                }
+            """
+        else:
+            palette = QPalette()
+            base_color = QColor(245, 245, 245) 
+            text_color = QColor(50, 50, 50)    
+            accent_color = QColor(70, 130, 180) 
+            
+            palette.setColor(QPalette.ColorRole.Window, base_color)
+            palette.setColor(QPalette.ColorRole.WindowText, text_color)
+            palette.setColor(QPalette.ColorRole.Base, QColor(255, 255, 255))
+            palette.setColor(QPalette.ColorRole.AlternateBase, QColor(235, 235, 235))
+            palette.setColor(QPalette.ColorRole.ToolTipBase, QColor(255, 255, 255))
+            palette.setColor(QPalette.ColorRole.ToolTipText, text_color)
+            palette.setColor(QPalette.ColorRole.Text, text_color)
+            palette.setColor(QPalette.ColorRole.Button, base_color)
+            palette.setColor(QPalette.ColorRole.ButtonText, text_color)
+            palette.setColor(QPalette.ColorRole.BrightText, QColor(0, 0, 0))
+            palette.setColor(QPalette.ColorRole.Link, accent_color)
+            palette.setColor(QPalette.ColorRole.Highlight, accent_color)
+            palette.setColor(QPalette.ColorRole.HighlightedText, QColor(255, 255, 255))
+            
+            app.setPalette(palette)
+            
+            button_style = """
+                QPushButton {
+                    border: 1px solid #C0C0C0;
+                    border-radius: 4px;
+                    padding: 6px 12px;
+                    background-color: #F5F5F5;
+                    color: #333333;
+                }
+                QPushButton:hover {
+                    background-color: #E0E0E0;
+                }
+                QPushButton:pressed {
+                    background-color: #D0D0D0;
+                }
+                QPushButton:disabled {
+                    background-color: #F0F0F0;
+                    color: #A0A0A0;
+                }
+            """
+            
+            self.start_button.setStyleSheet("""
+                QPushButton {
+                    border: 1px solid #4CAF50;
+                    border-radius: 4px;
+                    padding: 6px 12px;
+                    background-color: #4CAF50;
+                    color: white;
+                }
+                QPushButton:hover {
+                    background-color: #45a049;
+                }
+                QPushButton:pressed {
+                    background-color: #3d8b40;
+                }
+                QPushButton:disabled {
+                    background-color: #a5d6a7;
+                    color: #f5f5f5;
+                }
+            """)
+            
+            self.stop_button.setStyleSheet("""
+                QPushButton {
+                    border: 1px solid #f44336;
+                    border-radius: 4px;
+                    padding: 6px 12px;
+                    background-color: #f44336;
+                    color: white;
+                }
+                QPushButton:hover {
+                    background-color: #e53935;
+                }
+                QPushButton:pressed {
+                    background-color: #d32f2f;
+                }
+                QPushButton:disabled {
+                    background-color: #ef9a9a;
+                    color: #f5f5f5;
+                }
+            """)
+            
+            groupbox_style = """
+                QGroupBox {
+                    border: 1px solid #C0C0C0;
+                    border-radius: 4px;
+                    margin-top: 1.5ex;
+                    font-weight: bold;
+                }
+                QGroupBox::title {
+                    subcontrol-origin: margin;
+                    subcontrol-position: top center;
+                    padding: 0 5px;
+                }
+            """
+        
+        for widget in self.findChildren(QPushButton):
+            if widget not in [self.start_button, self.stop_button, self.theme_toggle_button]:
+                widget.setStyleSheet(button_style)
+        
+        for widget in self.findChildren(QGroupBox):
+            widget.setStyleSheet(groupbox_style)
+            
+        if hasattr(self, 'theme_toggle_button'):
+            self.theme_toggle_button.setText("Light Theme" if self.dark_mode else "Dark Theme")
+
+    def setup_ui(self):
+        self.setWindowTitle("Auto Unzip v.1.1.0")
+        self.setMinimumSize(650, 550)
+        
+        self.tab_widget = QTabWidget()
+        
+        main_tab = QWidget()
+        main_layout = QVBoxLayout()
+        
+        theme_layout = QHBoxLayout()
+        self.theme_toggle_button = QPushButton("Dark Theme") 
+        self.theme_toggle_button.clicked.connect(self.toggle_theme)
+        theme_layout.addStretch()
+        theme_layout.addWidget(self.theme_toggle_button)
+        main_layout.addLayout(theme_layout)
+        
+        status_group = QGroupBox("Status")
+        status_layout = QVBoxLayout()
+        
+        self.status_label = QLabel("Monitoring: Stopped")
+        self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.status_label.setStyleSheet("font-size: 14px; font-weight: bold; padding: 5px;")
+        status_layout.addWidget(self.status_label)
+        
+        control_layout = QHBoxLayout()
+        self.start_button = QPushButton("Start Monitoring")
+        self.stop_button = QPushButton("Stop Monitoring")
+        self.stop_button.setEnabled(False)
+        control_layout.addWidget(self.start_button)
+        control_layout.addWidget(self.stop_button)
+        status_layout.addLayout(control_layout)
+        
+        status_group.setLayout(status_layout)
+        main_layout.addWidget(status_group)
+        
+        settings_group = QGroupBox("Settings")
+        settings_layout = QFormLayout()
+        
+        self.downloads_path_input = QLineEdit(self.downloads_folder)
+        browse_downloads_button = QPushButton("Browse...")
+        browse_downloads_button.clicked.connect(lambda: self.browse_folder(self.downloads_path_input))
+        downloads_path_layout = QHBoxLayout()
+        downloads_path_layout.addWidget(self.downloads_path_input)
+        downloads_path_layout.addWidget(browse_downloads_button)
+        settings_layout.addRow("Monitor folder:", downloads_path_layout)
+        
+        self.extract_path_input = QLineEdit(self.extract_folder)
+        browse_extract_button = QPushButton("Browse...")
+        browse_extract_button.clicked.connect(lambda: self.browse_folder(self.extract_path_input))
+        extract_path_layout = QHBoxLayout()
+        extract_path_layout.addWidget(self.extract_path_input)
+        extract_path_layout.addWidget(browse_extract_button)
+        settings_layout.addRow("Extract to:", extract_path_layout)
+        
+        self.seven_zip_path_input = QLineEdit(self.seven_zip_path)
+        self.seven_zip_path_input.setPlaceholderText("Only needed for RAR, 7Z and encrypted archives")
+        browse_seven_zip_button = QPushButton("Browse...")
+        browse_seven_zip_button.clicked.connect(lambda: self.browse_file(self.seven_zip_path_input))
+        seven_zip_path_layout = QHBoxLayout()
+        seven_zip_path_layout.addWidget(self.seven_zip_path_input)
+        seven_zip_path_layout.addWidget(browse_seven_zip_button)
+        settings_layout.addRow("7-Zip executable:", seven_zip_path_layout)
+        
+        self.monitor_interval_spinner = QSpinBox()
+        self.monitor_interval_spinner.setRange(1, 3600)
+        self.monitor_interval_spinner.setValue(self.monitor_interval)
+        self.monitor_interval_spinner.setSuffix(" seconds")
+        settings_layout.addRow("Check interval:", self.monitor_interval_spinner)
+        
+        self.max_workers_spinner = QSpinBox()
+        self.max_workers_spinner.setRange(1, 64)
+        self.max_workers_spinner.setValue(self.max_workers)
+        settings_layout.addRow("Parallel extractions:", self.max_workers_spinner)
+        
+        self.zip_processes_spinner = QSpinBox()
+        self.zip_processes_spinner.setRange(0, 64)
+        self.zip_processes_spinner.setSpecialValueText("Off")
+        self.zip_processes_spinner.setValue(self.zip_processes)
+        self.zip_processes_spinner.setSuffix(" processes")
+        settings_layout.addRow("Split large ZIPs across:", self.zip_processes_spinner)
+        
+        self.settle_spinner = QSpinBox()
+        self.settle_spinner.setRange(0, 600)
+        self.settle_spinner.setValue(self.settle_seconds)
+        self.settle_spinner.setSuffix(" seconds")
+        settings_layout.addRow("Wait for downloads to settle:", self.settle_spinner)
+        
+        self.nested_depth_spinner = QSpinBox()
+        self.nested_depth_spinner.setRange(0, 10)
+        self.nested_depth_spinner.setSpecialValueText("Off")
+        self.nested_depth_spinner.setValue(self.nested_depth)
+        self.nested_depth_spinner.setSuffix(" levels")
+        settings_layout.addRow("Extract nested archives:", self.nested_depth_spinner)
+        
+        self.nested_max_spinner = QSpinBox()
+        self.nested_max_spinner.setRange(1, 4096)
+        self.nested_max_spinner.setValue(self.nested_max_gb)
+        self.nested_max_spinner.setSuffix(" GB")
+        settings_layout.addRow("Nested archive size limit:", self.nested_max_spinner)
+        
+        self.dedup_combo = QComboBox()
+        self.dedup_combo.addItems(DEDUP_MODES)
+        self.dedup_combo.setCurrentText(self.dedup_mode)
+        settings_layout.addRow("Duplicate archives:", self.dedup_combo)
+        
+        self.disk_reserve_spinner = QSpinBox()
+        self.disk_reserve_spinner.setRange(0, 1024)
+        self.disk_reserve_spinner.setValue(self.disk_reserve_gb)
+        self.disk_reserve_spinner.setSuffix(" GB")
+        settings_layout.addRow("Keep free on target:", self.disk_reserve_spinner)
+        
+        self.write_rate_spinner = QSpinBox()
+        self.write_rate_spinner.setRange(0, 10000)
+        self.write_rate_spinner.setSpecialValueText("Unlimited")
+        self.write_rate_spinner.setValue(self.write_rate_mb)
+        self.write_rate_spinner.setSuffix(" MB/s")
+        settings_layout.addRow("Write speed limit:", self.write_rate_spinner)
+        
+        self.speed_schedule_edit = QLineEdit(format_schedule(self.governor.schedule))
+        self.speed_schedule_edit.setPlaceholderText("e.g. 22:00-07:00=0 for full speed at night")
+        settings_layout.addRow("Speed schedule:", self.speed_schedule_edit)
+        
+        self.job_threads_spinner = QSpinBox()
+        self.job_threads_spinner.setRange(0, 64)
+        self.job_threads_spinner.setSpecialValueText("No limit")
+        self.job_threads_spinner.setValue(self.job_threads)
+        settings_layout.addRow("Threads per extraction:", self.job_threads_spinner)
+        
+        self.priority_combo = QComboBox()
+        self.priority_combo.addItems(PRIORITIES)
+        self.priority_combo.setCurrentText(self.extract_priority)
+        settings_layout.addRow("Extraction priority:", self.priority_combo)
+        
+        self.watcher_backend_combo = QComboBox()
+        self.watcher_backend_combo.addItems(WATCHER_BACKENDS)
+        self.watcher_backend_combo.setCurrentText(self.watcher_backend)
+        settings_layout.addRow("Folder watcher:", self.watcher_backend_combo)
+        
+        self.index_retention_spinner = QSpinBox()
+        self.index_retention_spinner.setRange(1, 3650)
+        self.index_retention_spinner.setValue(self.index_retention_days)
+        self.index_retention_spinner.setSuffix(" days")
+        settings_layout.addRow("Remember processed:", self.index_retention_spinner)
+        
+        self.log_max_lines_spinner = QSpinBox()
+        self.log_max_lines_spinner.setRange(100, 1000000)
+        self.log_max_lines_spinner.setSingleStep(1000)
+        self.log_max_lines_spinner.setValue(self.log_max_lines)
+        self.log_max_lines_spinner.setSuffix(" lines")
+        settings_layout.addRow("Activity log size:", self.log_max_lines_spinner)
+        
+        self.log_file_max_spinner = QSpinBox()
+        self.log_file_max_spinner.setRange(1, 1024)
+        self.log_file_max_spinner.setValue(self.log_file_max_mb)
+        self.log_file_max_spinner.setSuffix(" MB")
+        settings_layout.addRow("Rotate log file at:", self.log_file_max_spinner)
+        
+        self.metrics_port_spinner = QSpinBox()
+        self.metrics_port_spinner.setRange(0, 65535)
+        self.metrics_port_spinner.setSpecialValueText("Off")
+        self.metrics_port_spinner.setValue(self.metrics_port)
+        settings_layout.addRow("Metrics port:", self.metrics_port_spinner)
+        
+        self.control_port_spinner = QSpinBox()
+        self.control_port_spinner.setRange(0, 65535)
+        self.control_port_spinner.setSpecialValueText("Off")
+        self.control_port_spinner.setValue(self.control_port)
+        settings_layout.addRow("Control API port:", self.control_port_spinner)
+        
+        checkbox_container = QWidget()
+        checkbox_layout = QGridLayout(checkbox_container)
+        checkbox_layout.setColumnStretch(0, 1)
+        checkbox_layout.setColumnStretch(1, 1)
+        
+        self.auto_delete_checkbox = QCheckBox("Delete archives after extraction")
+        self.auto_delete_checkbox.setChecked(self.auto_delete)
+        checkbox_layout.addWidget(self.auto_delete_checkbox, 0, 0)
+        
+        self.auto_start_checkbox = QCheckBox("Auto-start monitoring on launch")
+        self.auto_start_checkbox.setChecked(self.auto_start_monitoring)
+        checkbox_layout.addWidget(self.auto_start_checkbox, 0, 1)
+        
+        self.minimize_to_tray_checkbox = QCheckBox("Minimize to system tray")
+        self.minimize_to_tray_checkbox.setChecked(self.settings.value("minimize_to_tray", "true") == "true")
+        checkbox_layout.addWidget(self.minimize_to_tray_checkbox, 1, 0)
+        
+        self.hash_archives_checkbox = QCheckBox("Identify archives by content hash")
+        self.hash_archives_checkbox.setChecked(self.hash_archives)
+        checkbox_layout.addWidget(self.hash_archives_checkbox, 1, 1)
+        
+        self.shortest_first_checkbox = QCheckBox("Extract small archives first")
+        self.shortest_first_checkbox.setChecked(self.shortest_first)
+        checkbox_layout.addWidget(self.shortest_first_checkbox, 2, 0)
+        
+        self.watch_subfolders_checkbox = QCheckBox("Include subfolders")
+        self.watch_subfolders_checkbox.setChecked(self.watch_subfolders)
+        checkbox_layout.addWidget(self.watch_subfolders_checkbox, 2, 1)
+        
+        self.sniff_content_checkbox = QCheckBox("Detect archives by content")
+        self.sniff_content_checkbox.setChecked(self.sniff_content)
+        checkbox_layout.addWidget(self.sniff_content_checkbox, 3, 0)
+        
+        self.verify_before_delete_checkbox = QCheckBox("Verify output before deleting archives")
+        self.verify_before_delete_checkbox.setChecked(self.verify_before_delete)
+        checkbox_layout.addWidget(self.verify_before_delete_checkbox, 3, 1)
+        
+        settings_layout.addRow("Options:", checkbox_container)
+        
+        save_settings_button = QPushButton("Save Settings")
+        save_settings_button.clicked.connect(self.save_settings)
+        settings_layout.addRow("", save_settings_button)
+        
+        settings_group.setLayout(settings_layout)
+        main_layout.addWidget(settings_group)
+        
+        queue_group = QGroupBox("Extraction Queue")
+        queue_layout = QVBoxLayout()
+        
+        self.queue_status_label = QLabel("Queued: 0 | Running: 0")
+        queue_layout.addWidget(self.queue_status_label)
+        
+        self.queue_list = QListWidget()
+        queue_layout.addWidget(self.queue_list)
+        
+        queue_buttons_layout = QHBoxLayout()
+        move_to_top_button = QPushButton("Move to Top")
+        move_to_top_button.clicked.connect(self.move_selected_job_to_top)
+        cancel_job_button = QPushButton("Cancel Selected")
+        cancel_job_button.clicked.connect(self.cancel_selected_job)
+        test_archive_button = QPushButton("Test Archive...")
+        test_archive_button.clicked.connect(self.test_archive)
+        contents_button = QPushButton("Archive Contents...")
+        contents_button.clicked.connect(self.show_archive_contents)
+        queue_buttons_layout.addWidget(move_to_top_button)
+        queue_buttons_layout.addWidget(cancel_job_button)
+        queue_buttons_layout.addWidget(test_archive_button)
+        queue_buttons_layout.addWidget(contents_button)
+        queue_layout.addLayout(queue_buttons_layout)
+        
+        queue_group.setLayout(queue_layout)
+        main_layout.addWidget(queue_group)
+        
+        log_group = QGroupBox("Activity Log")
+        log_layout = QVBoxLayout()
+        
+        self.log_view = QPlainTextEdit()
+        self.log_view.setReadOnly(True)
+        self.log_view.setMaximumBlockCount(self.log_max_lines)
+        log_layout.addWidget(self.log_view)
+        
+        clear_log_button = QPushButton("Clear Log")
+        clear_log_button.clicked.connect(self.clear_log)
+        log_layout.addWidget(clear_log_button)
+        
+        log_group.setLayout(log_layout)
+        main_layout.addWidget(log_group)
+        
+        main_tab.setLayout(main_layout)
+        
+        stats_tab = QWidget()
+        stats_layout = QFormLayout()
+        
+        self.stats_labels = {}
+        for key, title in (("completed", "Completed:"), ("failed", "Failed:"), ("cancelled", "Cancelled:"),
+                           ("bytes", "Data written:"), ("throughput", "Average throughput:"),
+                           ("duration", "Average extraction time:"), ("queue_wait", "Average queue wait:"),
+                           ("detection", "Average detection latency:")):
+            label = QLabel("-")
+            self.stats_labels[key] = label
+            stats_layout.addRow(title, label)
+        
+        stats_tab.setLayout(stats_layout)
+        
+        folders_tab = QWidget()
+        folders_layout = QVBoxLayout()
+        folders_layout.addWidget(QLabel("Further folders to watch, each with its own rules. Patterns are extensions "
+                                        "or wildcards separated by commas; the output may use {root}, {relpath}, "
+                                        "{name} and {stem}. Include and exclude pick the archive members that are "
+                                        "extracted by wildcard, min and max by size in MB. Saved with the "
+                                        "settings."))
+        self.roots_table = QTableWidget(0, 10)
+        self.roots_table.setHorizontalHeaderLabels(["Folder", "Patterns", "Output", "Delete", "Subfolders",
+                                                    "By content", "Include", "Exclude", "Min MB", "Max MB"])
+        self.roots_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        for root in self.extra_roots:
+            self.add_root_row(root)
+        folders_layout.addWidget(self.roots_table)
+        
+        roots_buttons_layout = QHBoxLayout()
+        add_root_button = QPushButton("Add Folder...")
+        add_root_button.clicked.connect(self.add_root)
+        remove_root_button = QPushButton("Remove Selected")
+        remove_root_button.clicked.connect(lambda: self.roots_table.removeRow(self.roots_table.currentRow()))
+        roots_buttons_layout.addWidget(add_root_button)
+        roots_buttons_layout.addWidget(remove_root_button)
+        folders_layout.addLayout(roots_buttons_layout)
+        folders_tab.setLayout(folders_layout)
+        
+        about_tab = QWidget()
+        about_layout = QVBoxLayout()
+        
+        about_text = QTextBrowser()
+        about_text.setOpenExternalLinks(True)
+        about_text.setHtml(f"""
+        <div style="text-align: center;">
+            <h1>Auto Unzip</h1>
+            <h2>Version 1.1.0</h2>
+            <p>Automatically extracts and organizes archive files from your downloads folder.</p>
+            <p>Supports ZIP, RAR, 7Z and TAR (gz, bz2, xz, zst) formats.</p>
+            <br>
+            <h2>Created by <b>Nrentzilas</b></h2>
+            <br>
+            <p>This tool monitors your downloads folder for new archive files 
+            and automatically extracts them to a designated folder.Feel free to star the repo as it help continue developing</p>
+        </div>
+        """)
+        
+        about_layout.addWidget(about_text)
+        
+        github_button = QPushButton("Visit GitHub Repository")
+        github_button.clicked.connect(lambda: QDesktopServices.openUrl(QUrl("https://github.com/Nrentzilas/Auto-Unzipper")))
+        
+        about_layout.addWidget(github_button)
+        about_tab.setLayout(about_layout)
+        
+        self.tab_widget.addTab(main_tab, "Main")
+        self.tab_widget.addTab(stats_tab, "Statistics")
+        self.tab_widget.addTab(folders_tab, "Folders")
+        self.tab_widget.addTab(about_tab, "About")
+        
+        self.setCentralWidget(self.tab_widget)
+        
+        self.start_button.clicked.connect(self.start_monitoring)
+        self.stop_button.clicked.connect(self.stop_monitoring)
+    
+    def toggle_theme(self):
+        self.dark_mode = not self.dark_mode
+        self.settings.setValue("dark_mode", str(self.dark_mode).lower())
+        self.apply_theme()
+        self.add_log(f"Switched to {'dark' if self.dark_mode else 'light'} theme")
+    
+    def setup_system_tray(self):
+        self.tray_icon = QSystemTrayIcon(self)
+        self.tray_icon.setIcon(QIcon(ICON_PATH))
+        self.tray_icon.setToolTip("Auto Unzip")
+        
+        tray_menu = QMenu()
+        
+        show_action = QAction("Show", self)
+        show_action.triggered.connect(self.show_from_tray)
+        
+        hide_action = QAction("Hide", self)
+        hide_action.triggered.connect(self.hide)
+        
+        start_action = QAction("Start Monitoring", self)
+        start_action.triggered.connect(self.start_monitoring)
+        
+        stop_action = QAction("Stop Monitoring", self)
+        stop_action.triggered.connect(self.stop_monitoring)
+        
+        toggle_theme_action = QAction("Toggle Theme", self)
+        toggle_theme_action.triggered.connect(self.toggle_theme)
+        
+        exit_action = QAction("Exit", self)
+        exit_action.triggered.connect(self.close_application)
+        
+        tray_menu.addAction(show_action)
+        tray_menu.addAction(hide_action)
+        tray_menu.addSeparator()
+        tray_menu.addAction(start_action)
+        tray_menu.addAction(stop_action)
+        tray_menu.addSeparator()
+        tray_menu.addAction(toggle_theme_action)
+        tray_menu.addSeparator()
+        tray_menu.addAction(exit_action)
+        
+        self.tray_icon.setContextMenu(tray_menu)
+        self.tray_icon.activated.connect(self.tray_icon_activated)
+        self.tray_icon.show()
+    
+    def show_from_tray(self):
+        self.showNormal()  
+        self.activateWindow()
+    
+    def tray_icon_activated(self, reason):
+        if reason == QSystemTrayIcon.ActivationReason.DoubleClick:
+            self.show_from_tray()
+    
+    def add_log(self, message):
+        log.info(message)
+    
+    def flush_log(self):
+        lines = self.log_handler.drain()
+        if not lines:
+            return
+        scrollbar = self.log_view.verticalScrollBar()
+        at_bottom = scrollbar.value() == scrollbar.maximum()
+        self.log_view.appendPlainText("\n".join(lines))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+    
+    def clear_log(self):
+        self.log_handler.clear()
+        self.log_view.clear()
+    
+    def browse_folder(self, line_edit):
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder", line_edit.text())
+        if folder:
+            line_edit.setText(folder)
+    
+    def browse_file(self, line_edit):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select File", line_edit.text())
+        if file_path:
+            line_edit.setText(file_path)
+    
+    def save_settings(self):
+        self.downloads_folder = self.downloads_path_input.text()
+        self.extract_folder = self.extract_path_input.text()
+        self.seven_zip_path = self.seven_zip_path_input.text()
+        self.auto_delete = self.auto_delete_checkbox.isChecked()
+        self.verify_before_delete = self.verify_before_delete_checkbox.isChecked()
+        self.monitor_interval = self.monitor_interval_spinner.value()
+        self.max_workers = self.max_workers_spinner.value()
+        self.settle_seconds = self.settle_spinner.value()
+        self.zip_processes = self.zip_processes_spinner.value()
+        self.nested_depth = self.nested_depth_spinner.value()
+        self.nested_max_gb = self.nested_max_spinner.value()
+        self.dedup_mode = self.dedup_combo.currentText()
+        self.disk_reserve_gb = self.disk_reserve_spinner.value()
+        self.write_rate_mb = self.write_rate_spinner.value()
+        self.job_threads = self.job_threads_spinner.value()
+        self.extract_priority = self.priority_combo.currentText()
+        try:
+            speed_schedule = parse_schedule(self.speed_schedule_edit.text())
+        except ValueError as e:
+            self.add_log(f"Keeping the previous speed schedule: {e}")
+            speed_schedule = self.governor.schedule
+            self.speed_schedule_edit.setText(format_schedule(speed_schedule))
+        self.shortest_first = self.shortest_first_checkbox.isChecked()
+        self.watch_subfolders = self.watch_subfolders_checkbox.isChecked()
+        self.sniff_content = self.sniff_content_checkbox.isChecked()
+        self.extra_roots = self.roots_from_table()
+        self.watcher_backend = self.watcher_backend_combo.currentText()
+        self.index_retention_days = self.index_retention_spinner.value()
+        self.hash_archives = self.hash_archives_checkbox.isChecked()
+        self.log_max_lines = self.log_max_lines_spinner.value()
+        self.log_file_max_mb = self.log_file_max_spinner.value()
+        metrics_port = self.metrics_port_spinner.value()
+        control_port = self.control_port_spinner.value()
+        self.auto_start_monitoring = self.auto_start_checkbox.isChecked()
+        minimize_to_tray = self.minimize_to_tray_checkbox.isChecked()
+        
+        self.settings.setValue("downloads_folder", self.downloads_folder)
+        self.settings.setValue("extract_folder", self.extract_folder)
+        self.settings.setValue("seven_zip_path", self.seven_zip_path)
+        self.settings.setValue("auto_delete", str(self.auto_delete).lower())
+        self.settings.setValue("verify_before_delete", str(self.verify_before_delete).lower())
+        self.settings.setValue("monitor_interval", self.monitor_interval)
+        self.settings.setValue("max_workers", self.max_workers)
+        self.settings.setValue("settle_seconds", self.settle_seconds)
+        self.settings.setValue("zip_processes", self.zip_processes)
+        self.settings.setValue("nested_depth", self.nested_depth)
+        self.settings.setValue("nested_max_gb", self.nested_max_gb)
+        self.settings.setValue("dedup_mode", self.dedup_mode)
+        self.settings.setValue("disk_reserve_gb", self.disk_reserve_gb)
+        self.settings.setValue("write_rate_mb", self.write_rate_mb)
+        self.settings.setValue("job_threads", self.job_threads)
+        self.settings.setValue("extract_priority", self.extract_priority)
+        self.settings.setValue("speed_schedule", format_schedule(speed_schedule))
+        self.settings.setValue("shortest_first", str(self.shortest_first).lower())
+        self.settings.setValue("watch_subfolders", str(self.watch_subfolders).lower())
+        self.settings.setValue("sniff_content", str(self.sniff_content).lower())
+        self.settings.setValue("watch_roots", json.dumps([root.to_dict() for root in self.extra_roots]))
+        self.settings.setValue("watcher_backend", self.watcher_backend)
+        self.settings.setValue("index_retention_days", self.index_retention_days)
+        self.settings.setValue("hash_archives", str(self.hash_archives).lower())
+        self.settings.setValue("log_max_lines", self.log_max_lines)
+        self.settings.setValue("log_file_max_mb", self.log_file_max_mb)
+        self.settings.setValue("metrics_port", metrics_port)
+        self.settings.setValue("control_port", control_port)
+        self.settings.setValue("auto_start_monitoring", str(self.auto_start_monitoring).lower())
+        self.settings.setValue("minimize_to_tray", str(minimize_to_tray).lower())
+        
+        self.scheduler.run_job = self.create_extractor()
+        self.scheduler.disk_reserve = self.disk_reserve_gb * 1024 ** 3
+        self.governor.configure(self.write_rate_mb * 1024 * 1024, self.job_threads, self.extract_priority,
+                                speed_schedule)
+        self.scheduler.queue.shortest_first = self.shortest_first
+        if self.monitor is not None:
+            self.monitor.set_roots(self.watch_roots())
+        self.index.retention_days = self.index_retention_days
+        self.index.use_hash = self.hash_archives
+        self.log_handler.set_max_lines(self.log_max_lines)
+        self.log_view.setMaximumBlockCount(self.log_max_lines)
+        self.log_file_handler.maxBytes = self.log_file_max_mb * 1024 * 1024
+        if metrics_port != self.metrics_port:
+            self.metrics_port = metrics_port
+            self.apply_metrics_port()
+        if control_port != self.control_port:
+            self.control_port = control_port
+            self.apply_control_port()
+        if self.max_workers != self.scheduler.workers:
+            self.scheduler.set_workers(self.max_workers)
+        
+        self.add_log("Settings saved")
+    
+    def start_monitoring(self):
+        os.makedirs(self.extract_folder, exist_ok=True)
+        
+        self.monitor = FolderMonitor(self.watch_roots(), self.monitor_interval,
+                                     self.monitor_signals.new_file_found.emit, self.watcher_backend, self.index,
+                                     self.metrics, ReadinessTracker(self.settle_seconds))
+        self.monitor.start()
+        
+        self.status_label.setText("Monitoring: Active")
+        self.status_label.setStyleSheet("font-size: 14px; font-weight: bold; color: #4CAF50; padding: 5px;")
+        self.start_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        folders = ", ".join(root.folder for root in self.monitor.roots)
+        self.add_log(f"Started monitoring {folders} for archives")
+    
+    def stop_monitoring(self):
+        if self.monitor and self.monitor.is_running():
+            self.monitor.stop()
+            self.monitor.join()
+            
+        self.status_label.setText("Monitoring: Stopped")
+        self.status_label.setStyleSheet("font-size: 14px; font-weight: bold; color: #f44336; padding: 5px;")
+        self.start_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.add_log("Stopped monitoring")
+    
+    def handle_new_file(self, file_path):
+        self.add_log(f"New file detected: {file_path}")
+        priority = self.monitor.priority_for(file_path) if self.monitor is not None else 0
+        self.submit_archive(file_path, priority=priority)
+    
+    def submit_archive(self, file_path, extract_path=None, delete_after=None, priority=0, members=None):
+        monitor = self.monitor
+        root = monitor.root_for(file_path) if monitor is not None else None
+        if extract_path is None:
+            extract_path = root.output_path(file_path) if root is not None else \
+                os.path.join(self.extract_folder, archive_stem(file_path))
+        if delete_after is None:
+            delete_after = root.delete if root is not None else self.auto_delete
+        if members is None and root is not None:
+            members = root.members
+        
+        volumes = monitor.volumes_for(file_path) if monitor is not None else None
+        return self.scheduler.submit(file_path, extract_path, bool(delete_after), priority, volumes, members)
+    
+    def submit_from_api(self, file_path, extract_path, delete_after, priority, members):
+        # Called by the control API from its own threads.
+        if not os.path.isfile(file_path):
+            raise ValueError(f"{file_path} is not a file")
+        if self.monitor is not None:
+            self.monitor.claim(file_path)
+        return self.submit_archive(file_path, extract_path, delete_after, priority, members)
+    
+    def handle_job_event(self, event, job):
+        if self.monitor is not None:
+            self.monitor.listener(event, job)
+        if event == "finished":
+            if self.monitor is not None:
+                if job.success:
+                    self.monitor.forget(job.archive)
+                elif self.monitor.follows_rules(job):
+                    self.monitor.retry_later(job.archive)
+            self.extraction_finished(job.archive, job.success)
+        elif event == "cancelled":
+            self.add_log(f"Extraction cancelled for {job.archive}")
+        if not self.queue_refresh_timer.isActive():
+            self.queue_refresh_timer.start()
+    
+    def extraction_finished(self, file_path, success):
+        self.add_log(f"Extraction {'completed' if success else 'failed'} for {file_path}")
+    
+    def refresh_queue_view(self):
+        queued, running = self.scheduler.counts()
+        self.queue_status_label.setText(f"Queued: {queued} | Running: {running}")
+        self.tray_icon.setToolTip(f"Auto Unzip - {queued} queued, {running} running")
+        
+        self.queue_list.clear()
+        for job in self.scheduler.running_jobs():
+            status = "running"
+            if job.progress is not None:
+                status = f"{job.progress.percent:.0f}% - {format_size(job.throughput())}/s"
+            item = QListWidgetItem(f"[{status}] {os.path.basename(job.archive)}")
+            item.setData(Qt.ItemDataRole.UserRole, None)
+            self.queue_list.addItem(item)
+        for job in self.scheduler.queue.pending():
+            size = f" ({format_size(job.unpacked_size)})" if job.unpacked_size else ""
+            item = QListWidgetItem(f"[queued] {os.path.basename(job.archive)}{size}")
+            item.setData(Qt.ItemDataRole.UserRole, job.id)
+            self.queue_list.addItem(item)
+    
+    def apply_metrics_port(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if self.metrics_port:
+            try:
+                self.metrics_server = MetricsServer(self.metrics, self.metrics_port)
+                self.metrics_server.start()
+            except OSError as e:
+                self.add_log(f"Could not serve metrics on port {self.metrics_port}: {e}")
+    
+    def apply_control_port(self):
+        if self.control_server is not None:
+            self.control_server.stop()
+            self.control_server = None
+        if self.control_port:
+            try:
+                self.control_server = ControlServer(self.scheduler, self.submit_from_api, self.events,
+                                                    self.control_port, load_token())
+                self.control_server.start()
+            except OSError as e:
+                self.add_log(f"Could not serve the control API on port {self.control_port}: {e}")
+    
+    def refresh_stats(self):
+        if self.tab_widget.currentIndex() != 1:
+            return
+        m = self.metrics
+        self.stats_labels["completed"].setText(str(m.jobs.value(outcome="success")))
+        self.stats_labels["failed"].setText(str(m.jobs.value(outcome="failure")))
+        self.stats_labels["cancelled"].setText(str(m.jobs.value(outcome="cancelled")))
+        self.stats_labels["bytes"].setText(format_size(m.bytes_written.value()))
+        self.stats_labels["throughput"].setText(f"{format_size(m.throughput.mean())}/s")
+        self.stats_labels["duration"].setText(f"{m.duration.mean():.2f} s")
+        self.stats_labels["queue_wait"].setText(f"{m.queue_wait.mean():.2f} s")
+        self.stats_labels["detection"].setText(f"{m.detection_latency.mean():.2f} s")
+    
+    def selected_job_id(self):
+        item = self.queue_list.currentItem()
+        if item is None:
+            return None
+        return item.data(Qt.ItemDataRole.UserRole)
+    
+    def move_selected_job_to_top(self):
+        job_id = self.selected_job_id()
+        if job_id is not None and self.scheduler.move_to_front(job_id):
+            self.add_log("Moved job to the top of the queue")
+    
+    def cancel_selected_job(self):
+        job_id = self.selected_job_id()
+        if job_id is not None:
+            self.scheduler.cancel(job_id)
+    
+    def test_archive(self):
+        archive, _ = QFileDialog.getOpenFileName(self, "Select Archive", self.downloads_folder)
+        if not archive:
+            return
+        
+        def run():
+            try:
+                problems = self.scheduler.run_job.test(archive)
+            except (ExtractionError, OSError) as e:
+                problems = [str(e)]
+            for problem in problems:
+                log.error(f"{archive}: {problem}")
+            self.add_log(f"Test of {archive} {'failed' if problems else 'passed'}")
+        
+        threading.Thread(target=run, name="test-archive", daemon=True).start()
+    
+    def show_archive_contents(self):
+        archive, _ = QFileDialog.getOpenFileName(self, "Select Archive", self.downloads_folder)
+        if not archive:
+            return
+        
+        def run():
+            try:
+                entries = self.scheduler.run_job.listing(archive)
+            except (ExtractionError, OSError) as e:
+                log.error(f"Could not read the contents of {archive}: {e}")
+                return
+            self.contents_signals.listing_ready.emit(archive, entries)
+        
+        threading.Thread(target=run, name="archive-contents", daemon=True).start()
+    
+    def open_archive_contents(self, archive, entries):
+        def extract(names, destination):
+            self.submit_archive(archive, os.path.join(destination, archive_stem(archive)), False,
+                                members=MemberFilter(names=names))
+            self.add_log(f"Extracting {len(names)} members of {archive}")
+        
+        ArchiveContentsDialog(archive, entries, extract, self).show()
+    
+    def changeEvent(self, event):
+        if event.type() == QEvent.Type.WindowStateChange:
+            minimize_to_tray = self.settings.value("minimize_to_tray", "true") == "true"
+            if self.isMinimized() and minimize_to_tray:
+                QTimer.singleShot(0, self.hide)
+                self.tray_icon.show() 
+        super().changeEvent(event)
+    
+    def close_application(self):
+        QApplication.quit()
+    
+    def closeEvent(self, event):
+        # The app lives on in the tray, so only monitoring stops here; see
+        # shutdown() for what happens on Exit.
+        self.stop_monitoring()
+        event.accept()
+    
+    def shutdown(self):
+        # Connected to QApplication.aboutToQuit.
+        self.stop_monitoring()
+        self.scheduler.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.control_server is not None:
+            self.control_server.stop()
+        self.index.close()
+        self.listings.close()
+        log.removeHandler(self.log_handler)
+        log.removeHandler(self.log_file_handler)
+        self.log_file_handler.close()
+
+def run_gui(argv=None):
+    app = QApplication(argv if argv is not None else sys.argv)
+    
+    if not QSystemTrayIcon.isSystemTrayAvailable():
+        print("System tray not available on this system")
+        return 1
+    
+    QApplication.setQuitOnLastWindowClosed(False)
+    
+    window = MainWindow()
+    app.aboutToQuit.connect(window.shutdown)
+    window.show()
+    
+    return app.exec()
\ No newline at end of file
@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from .config import settings_dir
+from .readiness import file_identity
+
+log = logging.getLogger(__name__)
+
+PRUNE_EVERY = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    path TEXT PRIMARY KEY,
+    identity TEXT NOT NULL,
+    entries BLOB NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS listings_used_at ON listings (used_at);
+"""
+
+
+def default_listing_path():
+    return os.path.join(settings_dir(), "listings.sqlite3")
+
+
+class ListingCache:
+    # The member listings of archives, (name, size, crc) per file, kept on
+    # disk so a large central directory or a tarball isn't read again to
+    # verify, filter or browse the same archive. A listing is keyed by the
+    # archive's path and only used while the size and mtime of every volume
+    # are unchanged. Beyond max_entries the least recently used are dropped.
+
+    def __init__(self, path=None, max_entries=2000):
+        self.path = path or default_listing_path()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _identity(volumes):
+        identity = file_identity(*volumes)
+        return json.dumps(identity) if identity is not None else None
+
+    def get(self, archive, volumes=None):
+        identity = self._identity(volumes or [archive])
+        if identity is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT identity, entries FROM listings WHERE path = ?", (archive,)
+            ).fetchone()
+            if row is None or row[0] != identity:
+                return None
+            self._conn.execute("UPDATE listings SET used_at = ? WHERE path = ?", (time.time(), archive))
+            self._conn.commit()
+        try:
+            return [tuple(entry) for entry in json.loads(zlib.decompress(row[1]))]
+        except (zlib.error, ValueError) as e:
+            log.warning(f"Ignoring the damaged cached listing of {archive}: {e}")
+            return None
+
+    def put(self, archive, entries, volumes=None):
+        identity = self._identity(volumes or [archive])
+        if identity is None:
+            return
+        blob = zlib.compress(json.dumps([list(entry) for entry in entries]).encode())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listings (path, identity, entries, used_at) VALUES (?, ?, ?, ?)",
+                (archive, identity, blob, time.time())
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune()
+
+    def _prune(self):
+        # Called with the lock held.
+        removed = self._conn.execute(
+            "DELETE FROM listings WHERE path IN ("
+            "SELECT path FROM listings ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        self._conn.commit()
+        if removed:
+            log.debug(f"Dropped {removed} cached archive listings")
@@ -0,0 +1,82 @@
+import fnmatch
+import re
+
+
+def _compile(patterns):
+    # A glob without a slash matches the file name of a member, one with a
+    # slash its whole path. Case is ignored, as for watched file names.
+    parts = []
+    for pattern in patterns:
+        pattern = pattern.strip().replace("\\", "/").strip("/")
+        prefix = "" if "/" in pattern else "(?:.*/)?"
+        parts.append(prefix + fnmatch.translate(pattern))
+    return re.compile("|".join(parts) or "(?!)", re.IGNORECASE).match
+
+
+class MemberFilter:
+    # Picks the members of an archive that are extracted. include and
+    # exclude are globs ("*.csv", "data/*/raw/*"); with include given only
+    # matching members are extracted, and exclude wins over include.
+    # min_size and max_size bound the uncompressed size in bytes, 0 meaning
+    # no bound. names picks members by their exact path, as chosen in the
+    # archive contents view. Directories follow the files inside them.
+
+    def __init__(self, include=None, exclude=None, min_size=0, max_size=0, names=None):
+        self.include = [p for p in include or () if p.strip()]
+        self.exclude = [p for p in exclude or () if p.strip()]
+        self.min_size = min_size
+        self.max_size = max_size
+        self.names = set(names) if names is not None else None
+        self._include = _compile(self.include)
+        self._exclude = _compile(self.exclude)
+
+    @property
+    def active(self):
+        return bool(self.include or self.exclude or self.min_size or self.max_size or self.names is not None)
+
+    def matches(self, name, size):
+        name = name.replace("\\", "/")
+        if self.names is not None and name not in self.names:
+            return False
+        if self.include and not self._include(name):
+            return False
+        if self.exclude and self._exclude(name):
+            return False
+        if size < self.min_size or (self.max_size and size > self.max_size):
+            return False
+        return True
+
+    def select(self, entries):
+        # The (name, size, crc) entries that match.
+        return [entry for entry in entries if self.matches(entry[0], entry[1])]
+
+    def describe(self):
+        parts = []
+        if self.names is not None:
+            parts.append(f"{len(self.names)} chosen members")
+        if self.include:
+            parts.append(f"including {', '.join(self.include)}")
+        if self.exclude:
+            parts.append(f"excluding {', '.join(self.exclude)}")
+        if self.min_size:
+            parts.append(f"at least {self.min_size} bytes")
+        if self.max_size:
+            parts.append(f"at most {self.max_size} bytes")
+        return "; ".join(parts) or "all members"
+
+    def to_dict(self):
+        data = {"include": self.include, "exclude": self.exclude, "min_size": self.min_size,
+                "max_size": self.max_size}
+        if self.names is not None:
+            data["names"] = sorted(self.names)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        # A single glob may be given as a string. An empty list of names would
+        # extract nothing and is refused.
+        include, exclude = ([v] if isinstance(v, str) else v for v in (data.get("include"), data.get("exclude")))
+        names = data.get("names")
+        if names is not None and not names:
+            raise ValueError("names must list at least one member")
+        return cls(include, exclude, int(data.get("min_size") or 0), int(data.get("max_size") or 0), names)
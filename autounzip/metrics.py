@@ -0,0 +1,267 @@
+import bisect
+import http.server
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+THROUGHPUT_BUCKETS = tuple(2 ** n * 1024 * 1024 for n in range(0, 12))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple((name, labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple((name, labels[name]) for name in self.label_names)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        if not items and not self.label_names:
+            items = [((), 0)]
+        return [(self.name, labels, value) for labels, value in items]
+
+
+class Gauge:
+    # Either set explicitly or backed by a callable evaluated at render time.
+    kind = "gauge"
+
+    def __init__(self, name, help_text, func=None):
+        self.name = name
+        self.help = help_text
+        self.func = func
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def value(self):
+        return self.func() if self.func is not None else self._value
+
+    def samples(self):
+        return [(self.name, (), self.value())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def sum(self):
+        return self._sum
+
+    def mean(self):
+        with self._lock:
+            return self._sum / self._count if self._count else 0.0
+
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            samples.append((self.name + "_bucket", (("le", _format_value(float(bound))),), cumulative))
+        samples.append((self.name + "_sum", (), total))
+        samples.append((self.name + "_count", (), count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class ExtractionMetrics:
+    # Collects pipeline metrics. Register listener() with the scheduler and
+    # call observe_detection() when the monitor hands out a new archive.
+
+    def __init__(self, scheduler=None):
+        self.registry = Registry()
+        r = self.registry
+        self.detected = r.register(Counter(
+            "autounzip_archives_detected_total", "Archives handed to the extraction queue by the monitor"))
+        self.detection_latency = r.register(Histogram(
+            "autounzip_detection_latency_seconds", "Time from an archive's last modification to its detection"))
+        self.jobs = r.register(Counter(
+            "autounzip_jobs_total", "Extraction jobs by outcome", ("outcome",)))
+        self.queue_wait = r.register(Histogram(
+            "autounzip_queue_wait_seconds", "Time jobs spent queued before a worker started them"))
+        self.duration = r.register(Histogram(
+            "autounzip_extraction_duration_seconds", "Wall-clock time per extraction"))
+        self.throughput = r.register(Histogram(
+            "autounzip_extraction_throughput_bytes_per_second", "Bytes written per second per extraction",
+            THROUGHPUT_BUCKETS))
+        self.bytes_written = r.register(Counter(
+            "autounzip_bytes_written_total", "Bytes written by extractions"))
+        if scheduler is not None:
+            r.register(Gauge("autounzip_queue_depth", "Jobs waiting in the queue",
+                             lambda: scheduler.counts()[0]))
+            r.register(Gauge("autounzip_jobs_in_flight", "Jobs currently extracting",
+                             lambda: scheduler.counts()[1]))
+            r.register(Gauge("autounzip_workers", "Configured extraction pool size",
+                             lambda: scheduler.workers))
+
+    def observe_detection(self, file_path):
+        self.detected.inc()
+        try:
+            latency = time.time() - os.stat(file_path).st_mtime
+        except OSError:
+            return
+        self.detection_latency.observe(max(0.0, latency))
+
+    def listener(self, event, job):
+        if event == "started":
+            self.queue_wait.observe(job.started_at - job.submitted_at)
+        elif event == "cancelled":
+            self.jobs.inc(outcome="cancelled")
+        elif event == "finished":
+            self.jobs.inc(outcome="success" if job.success else "failure")
+            duration = job.finished_at - job.started_at
+            self.duration.observe(duration)
+            if job.success and job.progress is not None:
+                self.bytes_written.inc(job.progress.bytes_done)
+                if duration > 0:
+                    self.throughput.observe(job.progress.bytes_done / duration)
+
+    def render(self):
+        return self.registry.render()
+
+
+class MetricsServer:
+    # Serves the registry in Prometheus text format on /metrics.
+
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        render = metrics.render
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        log.info(f"Serving metrics on http://127.0.0.1:{self.port}/metrics")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TextfileWriter:
+    # Periodically writes the registry to a file for node_exporter's textfile
+    # collector. The file is replaced atomically so scrapes never see a
+    # partial write.
+
+    def __init__(self, metrics, path, interval=15):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-textfile", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join(self.interval)
+        self.write()
+
+    def write(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.metrics.render())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning(f"Could not write metrics to {self.path}: {e}")
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            self.write()
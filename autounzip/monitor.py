@@ -0,0 +1,375 @@
+import logging
+import os
+import threading
+import time
+
+from .backlog import BACKLOG_BATCH, BACKLOG_PAGE, BACKLOG_PRIORITY, Backlog, iter_files
+from .readiness import ReadinessTracker, file_identity, has_temporary_sibling, is_temporary, looks_complete
+from .roots import excluded_folders
+from .sniff import HEAD_SIZE, SniffCache, format_from_name
+from .volumes import VolumeSetTracker, declares_volumes, parse_volume, volume_head
+from .watcher import create_watcher
+
+log = logging.getLogger(__name__)
+
+
+class FolderMonitor:
+    # Watches any number of roots (see WatchRoot) with a single watcher on a
+    # background thread and calls on_new_file(path) for every matching
+    # archive that hasn't been handed out before and isn't in the processed
+    # index, once the readiness tracker considers it complete. Multi-volume
+    # sets are collected until every volume is present and then handed out
+    # once, as their first volume. root_for(path) gives the rules to apply.
+    # File contents are sniffed, through a cache, to pick up archives with
+    # unfamiliar names and to set aside files that only look like archives.
+    # Files that were already there when monitoring started are worked
+    # through as a backlog, root by root and a page per tick, with at most
+    # BACKLOG_BATCH of them waiting for extraction; priority_for() puts them
+    # behind new arrivals. listener() has to see the scheduler's events for
+    # the backlog to move on.
+
+    def __init__(self, roots, interval, on_new_file, watcher_backend="auto", index=None, metrics=None,
+                 readiness=None):
+        self.roots = list(roots)
+        self.interval = interval
+        self.on_new_file = on_new_file
+        self.watcher_backend = watcher_backend
+        self.index = index
+        self.metrics = metrics
+        self.readiness = readiness if readiness is not None else ReadinessTracker()
+        self.volume_sets = VolumeSetTracker()
+        self.processed_files = set()
+        self.sniffer = SniffCache()
+        self._not_archives = {}
+        self._roots_changed = False
+        self.started_at = None
+        self._backlogs = {}
+        self._backlog_done = set()
+        self._backlog_jobs = set()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def set_roots(self, roots):
+        # Takes effect on the running monitor without restarting it.
+        self.roots = list(roots)
+        self._roots_changed = True
+
+    def root_for(self, file_path):
+        # The most specific root whose rules cover file_path.
+        matches = [root for root in self.roots if root.contains(file_path)]
+        return max(matches, key=lambda root: len(root.folder)) if matches else None
+
+    def start(self):
+        self._stopping.clear()
+        self.started_at = time.time()
+        self._backlogs = {}
+        self._backlog_done = set()
+        self._thread = threading.Thread(target=self.run, name="folder-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        log.info("Monitoring stopped")
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def volumes_for(self, file_path):
+        volume_set = self.volume_sets.set_for(file_path)
+        if volume_set is None:
+            return [file_path]
+        return volume_set.paths()
+
+    def priority_for(self, file_path):
+        return BACKLOG_PRIORITY if file_path in self._backlog_jobs else 0
+
+    def listener(self, event, job):
+        if event not in ("finished", "cancelled"):
+            return
+        self._backlog_jobs.discard(job.archive)
+        for backlog in list(self._backlogs.values()):
+            if backlog.finished(job.volumes, event == "finished" and job.success):
+                break
+
+    def forget(self, file_path):
+        # Only safe once the processed index knows about the archive, or the
+        # next scan would hand it out again.
+        volume_set = self.volume_sets.set_for(file_path)
+        if volume_set is None:
+            paths = [file_path]
+        else:
+            paths = volume_set.paths()
+            self.volume_sets.remove(volume_set)
+        self.processed_files.difference_update(paths)
+        self.readiness.discard(file_path)
+
+    def claim(self, file_path):
+        # For archives queued some other way, so they aren't handed out as
+        # well.
+        self.processed_files.update(self.volumes_for(file_path))
+        self.readiness.discard(file_path)
+
+    def retry_later(self, file_path):
+        volumes = self.volumes_for(file_path)
+        self.processed_files.difference_update(volumes)
+        self.readiness.retry_later(file_path, [p for p in volumes if p != file_path])
+
+    def follows_rules(self, job):
+        # True when job was queued with the rules of its watched folder, so
+        # the retry_later() that queues it again the same way loses nothing.
+        root = self.root_for(job.archive)
+        return root is not None and job.members is root.members and job.delete_after == root.delete \
+            and job.extract_path == root.output_path(job.archive)
+
+    def scan_once(self):
+        # Yields the archives already sitting in the folders as the walk
+        # reaches them. They are assumed to have settled, so only the
+        # structural check applies here.
+        excluded = excluded_folders(self.roots)
+        for root in self.roots:
+            for entry in iter_files(root.folder, root.recursive, excluded):
+                file_path = self._candidate(entry.path)
+                if file_path is None:
+                    continue
+                if has_temporary_sibling(file_path) or not looks_complete(file_path):
+                    log.warning(f"Skipping {file_path}, it looks incomplete")
+                    continue
+                if not self._is_archive(file_path):
+                    continue
+                self._dispatch(file_path)
+                yield file_path
+        for volume_set in self.volume_sets.complete_sets(self._set_pending):
+            self._dispatch(volume_set.first)
+            yield volume_set.first
+
+    def _candidate(self, file_path):
+        folder, file = os.path.split(file_path)
+        if is_temporary(file):
+            return None
+        if file_path in self.processed_files or file_path in self.readiness:
+            return None
+        if file_path in self._not_archives:
+            if self._not_archives[file_path] == file_identity(file_path):
+                return None
+            del self._not_archives[file_path]
+        root = self.root_for(file_path)
+        if root is None:
+            return None
+
+        volume = parse_volume(file)
+        if volume is None:
+            if not root.matches(file) and not (root.sniff and self.sniffer.is_archive(file_path)):
+                return None
+            if self.index is not None and self.index.seen(file_path):
+                return None
+            head = volume_head(file)
+            if head is not None and (self.volume_sets.has_siblings(folder, file)
+                                     or declares_volumes(file_path)):
+                volume = head
+
+        if volume is not None:
+            self.volume_sets.add(folder, file, volume)
+            return None
+        if not self._is_archive(file_path, settled=False):
+            return None
+        return file_path
+
+    def _set_pending(self, volume_set):
+        # True when a complete set still needs extracting; sets that the index
+        # already knows about are marked processed instead.
+        first = volume_set.first
+        if first is None or first in self.processed_files or first in self.readiness:
+            return False
+        if self.index is not None and self.index.seen(first):
+            self.processed_files.update(volume_set.paths())
+            return False
+        return True
+
+    def _is_archive(self, file_path, settled=True):
+        # Volume sets and signature-less tarballs pass on their names. Until
+        # a file has settled it is only judged once its header is complete.
+        if len(self.volumes_for(file_path)) > 1 or format_from_name(file_path) == "tar":
+            return True
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return False
+        if not settled and st.st_size < HEAD_SIZE:
+            return True
+        if self.sniffer.is_archive(file_path, st):
+            return True
+        log.warning(f"Skipping {file_path}, its content is not an archive")
+        self._not_archives[file_path] = file_identity(file_path)
+        return False
+
+    def _create_backlogs(self):
+        # Every root gets its backlog as soon as its folder exists, so each
+        # knows which files to leave to it; the walks themselves run one
+        # root after the other.
+        for root in self.roots:
+            if root.folder in self._backlogs or not os.path.isdir(root.folder):
+                continue
+            saved = self.index.backlog_cursor(root.folder) if self.index is not None else None
+            self._backlogs[root.folder] = Backlog(root, self.started_at, excluded_folders(self.roots), saved)
+            if saved is not None:
+                log.info(f"Resuming the backlog of {root.folder} after {os.path.join(*saved[0])}")
+            else:
+                log.info(f"Working through the files already in {root.folder}")
+
+    def _current_backlog(self):
+        # The first root whose backlog hasn't been walked to the end yet.
+        self._create_backlogs()
+        for root in self.roots:
+            backlog = self._backlogs.get(root.folder)
+            if backlog is not None and not backlog.exhausted:
+                return backlog
+        return None
+
+    def _deferred(self, path):
+        # Files that were already there when monitoring started are left to
+        # the backlog of their root while it is still going to reach them.
+        # Anything created or moved in since is a new arrival, whichever
+        # backlog is being walked.
+        root = self.root_for(path)
+        if root is None:
+            return False
+        backlog = self._backlogs.get(root.folder)
+        if backlog is None or not backlog.ahead(path):
+            return False
+        try:
+            return os.stat(path).st_ctime < self.started_at
+        except OSError:
+            return False
+
+    def _feed_backlog(self):
+        # Hands out the next page of the backlog. Returns True while there is
+        # more that could be handed out right away.
+        self._save_backlogs()
+        backlog = self._current_backlog()
+        if backlog is None:
+            return False
+        examined = 0
+        while backlog.in_flight < BACKLOG_BATCH and examined < BACKLOG_PAGE:
+            entry = backlog.next()
+            if entry is None:
+                log.info(f"All files already in {backlog.root.folder} were handed out")
+                return True
+            examined += 1
+            self._take_from_backlog(backlog, entry)
+        return backlog.in_flight < BACKLOG_BATCH
+
+    def _take_from_backlog(self, backlog, entry):
+        path = entry.path
+        root = self.root_for(path)
+        file_path = None
+        if root is not None and root.folder == backlog.root.folder:
+            file_path = self._candidate(path)
+        if file_path is None:
+            if self.volume_sets.set_for(path) is not None:
+                backlog.handed_out(path, counted=False)
+            else:
+                backlog.skipped(path)
+            return
+        try:
+            settled = entry.stat().st_mtime < self.started_at and not has_temporary_sibling(file_path) \
+                and looks_complete(file_path)
+        except OSError:
+            backlog.skipped(path)
+            return
+        if not settled:
+            # Still being written when monitoring started, or it looks that
+            # way: it is waited for like a new arrival.
+            self.readiness.offer(file_path)
+            backlog.skipped(path)
+            return
+        if not self._is_archive(file_path):
+            backlog.skipped(path)
+            return
+        backlog.handed_out(file_path)
+        self._backlog_jobs.add(file_path)
+        self._dispatch(file_path)
+        self.on_new_file(file_path)
+
+    def _save_backlogs(self):
+        for folder, backlog in list(self._backlogs.items()):
+            if folder in self._backlog_done:
+                continue
+            if backlog.complete:
+                self._backlog_done.add(folder)
+                log.info(f"Backlog of {folder} is done")
+                if self.index is not None:
+                    self.index.clear_backlog_cursor(folder)
+                continue
+            position = backlog.unsaved()
+            if position is not None and self.index is not None:
+                self.index.save_backlog_cursor(folder, position, backlog.since)
+
+    def _dispatch(self, file_path):
+        self.processed_files.update(self.volumes_for(file_path))
+        if self.metrics is not None:
+            self.metrics.observe_detection(file_path)
+
+    def _available_folders(self):
+        folders = []
+        for root in self.roots:
+            if os.path.isdir(root.folder):
+                folders.append((root.folder, root.recursive))
+            elif root.folder not in self._missing:
+                self._missing.add(root.folder)
+                log.warning(f"Warning: Folder {root.folder} does not exist!")
+        return folders
+
+    def run(self):
+        log.info(f"Monitoring started for {', '.join(root.folder for root in self.roots)}")
+        watcher = None
+        folders = None
+        self._missing = set()
+        while not self._stopping.is_set():
+            try:
+                available = self._available_folders()
+                if watcher is not None and (available != folders or self._roots_changed):
+                    watcher.close()
+                    watcher = None
+                if watcher is None:
+                    self._roots_changed = False
+                    folders = available
+                    if not folders:
+                        self._stopping.wait(self.interval)
+                        continue
+                    watcher = create_watcher(folders, self.interval, self.watcher_backend,
+                                             excluded_folders(self.roots))
+                    self._missing.difference_update(folder for folder, _ in folders)
+                    log.info(f"Using {watcher.name} watcher for {len(folders)} folder(s)")
+
+                busy = self._feed_backlog()
+                for path in watcher.changes(0.05 if busy else 1.0):
+                    if self._deferred(path):
+                        continue
+                    file_path = self._candidate(path)
+                    if file_path is not None:
+                        self.readiness.offer(file_path)
+
+                for volume_set in self.volume_sets.complete_sets(self._set_pending):
+                    paths = volume_set.paths()
+                    log.info(f"Volume set {volume_set.base} is complete ({len(paths)} volumes)")
+                    self.readiness.offer(volume_set.first, [p for p in paths if p != volume_set.first])
+
+                for file_path in self.readiness.poll():
+                    if not self._is_archive(file_path):
+                        continue
+                    self._dispatch(file_path)
+                    self.on_new_file(file_path)
+            except Exception as e:
+                log.error(f"Error in monitoring thread: {str(e)}")
+                if watcher is not None:
+                    watcher.close()
+                    watcher = None
+                self._stopping.wait(self.interval)
+
+        if watcher is not None:
+            watcher.close()
+        self._save_backlogs()
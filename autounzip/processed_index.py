@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .config import settings_dir
+
+log = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+PRUNE_EVERY = 500
+# Status of archives of which only some members were extracted.
+PARTIAL = "partial"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT,
+    status TEXT NOT NULL,
+    duration REAL,
+    output_path TEXT,
+    processed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archives_processed_at ON archives (processed_at);
+CREATE INDEX IF NOT EXISTS archives_content_hash ON archives (content_hash);
+CREATE TABLE IF NOT EXISTS backlog (
+    folder TEXT PRIMARY KEY,
+    position TEXT NOT NULL,
+    since REAL NOT NULL
+);
+"""
+
+
+def default_index_path():
+    return os.path.join(settings_dir(), "processed.sqlite3")
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ProcessedIndex:
+    # Remembers which archives were extracted so a restart doesn't extract
+    # everything in the folder again. An archive counts as processed when its
+    # path, size and mtime match a successful entry; with use_hash enabled an
+    # mtime-only change is resolved by comparing content hashes.
+
+    def __init__(self, path=None, retention_days=90, max_entries=100000, use_hash=False):
+        self.path = path or default_index_path()
+        self.retention_days = retention_days
+        self.max_entries = max_entries
+        self.use_hash = use_hash
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.prune()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def seen(self, path, st=None):
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return False
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, content_hash FROM archives WHERE path = ? AND status = 'done'",
+                (path,)
+            ).fetchone()
+        if row is None:
+            return False
+
+        size, mtime_ns, content_hash = row
+        if size != st.st_size:
+            return False
+        if mtime_ns == st.st_mtime_ns:
+            return True
+        if self.use_hash and content_hash:
+            try:
+                return hash_file(path) == content_hash
+            except OSError:
+                return False
+        return False
+
+    def output_for_hash(self, content_hash):
+        # Where the most recent successful extraction of this content went.
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output_path FROM archives WHERE content_hash = ? AND status = 'done' "
+                "AND output_path IS NOT NULL ORDER BY processed_at DESC LIMIT 1",
+                (content_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record(self, path, st, status, duration=None, output_path=None, content_hash=None):
+        # Only complete extractions are looked up again, so only they are
+        # hashed.
+        if content_hash is None and status == "done" and self.use_hash and os.path.exists(path):
+            try:
+                content_hash = hash_file(path)
+            except OSError as e:
+                log.warning(f"Could not hash {path}: {e}")
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO archives "
+                "(path, size, mtime_ns, content_hash, status, duration, output_path, processed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, content_hash, status, duration, output_path, time.time())
+            )
+            self._conn.commit()
+            self._writes += 1
+            prune_due = self._writes % PRUNE_EVERY == 0
+        if prune_due:
+            self.prune()
+
+    def record_job(self, job):
+        if job.stat is None:
+            return
+        duration = None
+        if job.started_at is not None and job.finished_at is not None:
+            duration = job.finished_at - job.started_at
+        if job.members is not None and job.members.active:
+            # Only part of the archive was extracted: neither seen() nor a
+            # later duplicate may take that output for the whole archive.
+            status = PARTIAL if job.state == "done" else job.state
+            self.record(job.archive, job.stat, status, duration)
+            return
+        self.record(job.archive, job.stat, job.state, duration, job.extract_path, job.content_hash)
+
+    def listener(self, event, job):
+        if event == "finished":
+            try:
+                self.record_job(job)
+            except sqlite3.Error as e:
+                log.error(f"Could not record {job.archive} in the processed index: {e}")
+
+    def forget(self, path):
+        with self._lock:
+            self._conn.execute("DELETE FROM archives WHERE path = ?", (path,))
+            self._conn.commit()
+
+    def backlog_cursor(self, folder):
+        # Where an interrupted backlog of folder got to, as (position, since),
+        # or None; see Backlog.
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT position, since FROM backlog WHERE folder = ?", (folder,)
+            ).fetchone()
+        if row is None:
+            return None
+        return tuple(json.loads(row[0])), row[1]
+
+    def save_backlog_cursor(self, folder, position, since):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO backlog (folder, position, since) VALUES (?, ?, ?)",
+                (folder, json.dumps(list(position)), since)
+            )
+            self._conn.commit()
+
+    def clear_backlog_cursor(self, folder):
+        with self._lock:
+            self._conn.execute("DELETE FROM backlog WHERE folder = ?", (folder,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM archives")
+            self._conn.commit()
+
+    def prune(self):
+        with self._lock:
+            removed = 0
+            if self.retention_days:
+                cutoff = time.time() - self.retention_days * 86400
+                removed += self._conn.execute(
+                    "DELETE FROM archives WHERE processed_at < ?", (cutoff,)
+                ).rowcount
+            if self.max_entries:
+                removed += self._conn.execute(
+                    "DELETE FROM archives WHERE path IN ("
+                    "SELECT path FROM archives ORDER BY processed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+            self._conn.commit()
+        if removed:
+            log.info(f"Pruned {removed} old entries from the processed index")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM archives").fetchone()[0]
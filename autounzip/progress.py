@@ -0,0 +1,122 @@
+import collections
+import os
+import re
+import subprocess
+import threading
+import time
+
+# 7-Zip (with -bsp1) and unrar redraw their progress line in place using
+# carriage returns and backspaces, so those count as line breaks too.
+_LINE_BREAK = re.compile(rb"[\r\n\b]+")
+_PERCENT_LINE = re.compile(r"^\s*(\d{1,3})%(?:\s+(\d+))?(?:\s+[-+U]\s+(.*?))?\s*$")
+
+STDERR_TAIL_LINES = 50
+READ_SIZE = 64 * 1024
+
+
+class Progress:
+    __slots__ = ("percent", "bytes_done", "bytes_total", "files_done", "current_file")
+
+    def __init__(self, percent=0.0, bytes_done=0, bytes_total=0, files_done=0, current_file=""):
+        self.percent = percent
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        self.files_done = files_done
+        self.current_file = current_file
+
+    def __repr__(self):
+        return f"<Progress {self.percent:.0f}% {self.bytes_done}/{self.bytes_total} {self.current_file!r}>"
+
+
+class Throttle:
+    # Forwards progress to callback at most once per interval, always letting
+    # the first and the first completing (100%) update through.
+
+    def __init__(self, callback, interval=0.25):
+        self.callback = callback
+        self.interval = interval
+        self._last = 0.0
+        self._completed = False
+
+    def __call__(self, progress):
+        if self._completed:
+            return
+        now = time.monotonic()
+        if progress.percent >= 100:
+            self._completed = True
+        elif now - self._last < self.interval:
+            return
+        self._last = now
+        self.callback(progress)
+
+
+def parse_progress_line(line, bytes_total=0):
+    match = _PERCENT_LINE.match(line)
+    if not match:
+        return None
+    percent = min(100, int(match.group(1)))
+    files_done = int(match.group(2)) if match.group(2) else 0
+    return Progress(
+        percent=percent,
+        bytes_done=bytes_total * percent // 100,
+        bytes_total=bytes_total,
+        files_done=files_done,
+        current_file=match.group(3) or "",
+    )
+
+
+def run_with_progress(command, progress=None, bytes_total=0, governor=None):
+    # Runs an extraction tool, turning its progress output into Progress
+    # events as it streams. Only the tail of stderr is kept, so memory stays
+    # flat however much the tool prints. A governor (see governor.py) is fed
+    # the progress to pace the tool. Returns (returncode, stderr_tail).
+    process = subprocess.Popen(
+        governor.command(command) if governor is not None else command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        creationflags=governor.creationflags() if governor is not None else 0
+    )
+
+    stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+
+    def drain_stderr():
+        for raw in process.stderr:
+            line = raw.decode(errors="replace").rstrip()
+            if line:
+                stderr_tail.append(line)
+
+    stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+    stderr_thread.start()
+
+    pending = b""
+    bytes_done = 0
+    fd = process.stdout.fileno()
+    while True:
+        chunk = os.read(fd, READ_SIZE)
+        if not chunk:
+            break
+        parts = _LINE_BREAK.split(pending + chunk)
+        pending = parts.pop()
+        if progress is None and governor is None:
+            continue
+        for part in parts:
+            event = parse_progress_line(part.decode(errors="replace"), bytes_total)
+            if event is None:
+                continue
+            if progress is not None:
+                progress(event)
+            if governor is not None and event.bytes_done > bytes_done:
+                governor.pace(process, event.bytes_done - bytes_done)
+                bytes_done = event.bytes_done
+
+    if progress is not None and pending:
+        event = parse_progress_line(pending.decode(errors="replace"), bytes_total)
+        if event is not None:
+            progress(event)
+
+    returncode = process.wait()
+    process.stdout.close()
+    stderr_thread.join()
+    process.stderr.close()
+    return returncode, "\n".join(stderr_tail)
@@ -0,0 +1,183 @@
+import logging
+import os
+import struct
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Suffixes browsers and download managers use while a file is still being
+# written. Firefox also leaves an empty placeholder with the final name next to
+# its .part file, so a sibling with one of these suffixes means "not yet".
+TEMP_SUFFIXES = (".crdownload", ".part", ".partial", ".download", ".opdownload", ".tmp", ".!ut", ".aria2")
+
+ZIP_EOCD_SIGNATURE = b"PK\x05\x06"
+ZIP_EOCD_MAX_DISTANCE = 22 + 65535
+SEVEN_ZIP_SIGNATURE = b"7z\xbc\xaf\x27\x1c"
+XZ_FOOTER_MAGIC = b"YZ"
+
+
+def is_temporary(name):
+    return name.lower().endswith(TEMP_SUFFIXES)
+
+
+def has_temporary_sibling(path):
+    return any(os.path.exists(path + suffix) for suffix in TEMP_SUFFIXES)
+
+
+def looks_complete(path):
+    # Cheap structural check on the end of the file. Returns False when the
+    # archive is clearly truncated; formats without a usable trailer pass.
+    size = os.path.getsize(path)
+    if size == 0:
+        return False
+    name = path.lower()
+    with open(path, "rb") as f:
+        if name.endswith(".zip"):
+            distance = min(size, ZIP_EOCD_MAX_DISTANCE)
+            f.seek(size - distance)
+            return ZIP_EOCD_SIGNATURE in f.read(distance)
+        if name.endswith(".7z"):
+            header = f.read(32)
+            if len(header) < 32 or not header.startswith(SEVEN_ZIP_SIGNATURE):
+                return False
+            next_header_offset, next_header_size = struct.unpack_from("<QQ", header, 12)
+            return size >= 32 + next_header_offset + next_header_size
+        if name.endswith((".tar.xz", ".txz")):
+            f.seek(size - 2)
+            return f.read(2) == XZ_FOOTER_MAGIC
+    return True
+
+
+def file_identity(*paths):
+    try:
+        return tuple((st.st_size, st.st_mtime_ns) for st in map(os.stat, paths))
+    except OSError:
+        return None
+
+
+class Candidate:
+    # members are further files (other volumes of a set) that have to settle
+    # together with path.
+    __slots__ = ("path", "members", "identity", "stable_since", "attempts", "next_check")
+
+    def __init__(self, path, now, members=()):
+        self.path = path
+        self.members = tuple(members)
+        self.identity = None
+        self.stable_since = now
+        self.attempts = 0
+        self.next_check = now
+
+
+class ReadinessTracker:
+    # Holds detected archives until they look like finished downloads: size
+    # and mtime unchanged for stable_seconds, no temporary sibling, and an
+    # intact trailer. Archives that fail the trailer check, or whose
+    # extraction failed, are retried with exponential backoff.
+
+    def __init__(self, stable_seconds=2.0, max_attempts=5, backoff=5.0, max_backoff=300.0):
+        self.stable_seconds = stable_seconds
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.candidates = {}
+        self._attempts = {}
+        self._given_up = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def __contains__(self, path):
+        return path in self.candidates
+
+    def offer(self, path, members=()):
+        with self._lock:
+            if path in self.candidates:
+                return
+            if path in self._given_up:
+                # Only look at an abandoned file again once it has changed.
+                if self._given_up[path] == file_identity(path, *members):
+                    return
+                del self._given_up[path]
+            self.candidates[path] = Candidate(path, time.monotonic(), members)
+
+    def discard(self, path):
+        with self._lock:
+            self.candidates.pop(path, None)
+            self._attempts.pop(path, None)
+
+    def _give_up(self, path, members=()):
+        self.candidates.pop(path, None)
+        self._attempts.pop(path, None)
+        self._given_up[path] = file_identity(path, *members)
+
+    def retry_later(self, path, members=()):
+        # Called when extraction failed. Gives the file another go after a
+        # backoff, unless it has failed too often without changing.
+        with self._lock:
+            return self._retry_later(path, members)
+
+    def _retry_later(self, path, members):
+        key = file_identity(path, *members)
+        if key is None:
+            self.discard(path)
+            return False
+        previous_key, attempts = self._attempts.get(path, (None, 0))
+        attempts = attempts + 1 if previous_key == key else 1
+        self._attempts[path] = (key, attempts)
+        if attempts >= self.max_attempts:
+            log.warning(f"Giving up on {path} after {attempts} failed attempts")
+            self._give_up(path, members)
+            return False
+        candidate = Candidate(path, time.monotonic(), members)
+        candidate.attempts = attempts
+        candidate.next_check = time.monotonic() + self._delay(attempts)
+        self.candidates[path] = candidate
+        log.info(f"Retrying {path} in {self._delay(attempts):g} seconds")
+        return True
+
+    def _delay(self, attempts):
+        return min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+
+    def poll(self):
+        with self._lock:
+            return self._poll()
+
+    def _poll(self):
+        now = time.monotonic()
+        ready = []
+        for path, candidate in list(self.candidates.items()):
+            if candidate.next_check > now:
+                continue
+            identity = file_identity(path, *candidate.members)
+            if identity is None:
+                del self.candidates[path]
+                continue
+
+            if identity != candidate.identity:
+                candidate.identity = identity
+                candidate.stable_since = now
+            if now - candidate.stable_since < self.stable_seconds:
+                continue
+            if any(has_temporary_sibling(p) for p in (path,) + candidate.members):
+                continue
+
+            try:
+                complete = looks_complete(path)
+            except OSError:
+                complete = False
+            if complete:
+                del self.candidates[path]
+                ready.append(path)
+                continue
+
+            candidate.attempts += 1
+            if candidate.attempts >= self.max_attempts:
+                log.warning(f"{path} still looks incomplete after {candidate.attempts} checks, giving up")
+                self._give_up(path, candidate.members)
+                continue
+            candidate.next_check = now + self._delay(candidate.attempts)
+            log.info(f"{path} looks incomplete, checking again in {self._delay(candidate.attempts):g} seconds")
+        return ready
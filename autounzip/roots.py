@@ -0,0 +1,87 @@
+import fnmatch
+import json
+import os
+import re
+
+from .extract import SUPPORTED_EXTENSIONS, archive_stem
+from .members import MemberFilter
+
+DEFAULT_OUTPUT = os.path.join("{root}", "Extracted", "{relpath}", "{stem}")
+
+
+def compile_patterns(patterns):
+    # One case-insensitive regex for a mix of extensions (".zip") and globs
+    # ("invoice-*.zip"), so matching a name is a single call.
+    parts = []
+    for pattern in patterns:
+        if pattern.startswith(".") and not any(c in pattern for c in "*?["):
+            pattern = "*" + pattern
+        parts.append(fnmatch.translate(pattern))
+    return re.compile("|".join(parts) or "(?!)", re.IGNORECASE).match
+
+
+class WatchRoot:
+    # A watched folder and the rules for archives that appear in it. output
+    # is a template with {root}, {relpath} (the archive's folder relative to
+    # root), {name} and {stem}; recursive roots also watch subfolders. With
+    # sniff, files whose name doesn't match are still picked up when their
+    # content is an archive. members (a MemberFilter) limits which members
+    # of the archives are extracted.
+
+    def __init__(self, folder, patterns=None, output=None, delete=False, recursive=False, sniff=True,
+                 members=None):
+        self.folder = os.path.abspath(folder)
+        self.patterns = list(patterns or SUPPORTED_EXTENSIONS)
+        self.output = output or DEFAULT_OUTPUT
+        self.delete = delete
+        self.recursive = recursive
+        self.sniff = sniff
+        self.members = members or MemberFilter()
+        self.matches = compile_patterns(self.patterns)
+
+    def __repr__(self):
+        return f"<WatchRoot {self.folder}{' (recursive)' if self.recursive else ''}>"
+
+    def contains(self, path):
+        parent = os.path.dirname(path)
+        if parent == self.folder:
+            return True
+        return self.recursive and parent.startswith(self.folder + os.sep)
+
+    def output_path(self, archive):
+        relpath = os.path.relpath(os.path.dirname(archive), self.folder)
+        return os.path.normpath(self.output.format(
+            root=self.folder,
+            relpath="" if relpath == os.curdir else relpath,
+            name=os.path.basename(archive),
+            stem=archive_stem(archive),
+        ))
+
+    def output_base(self):
+        # The fixed part of the output template. Recursive scans skip it so
+        # extracted files aren't picked up as new archives.
+        template = self.output.replace("{root}", self.folder)
+        fixed = template.split("{", 1)[0]
+        if "{" in template:
+            fixed = os.path.dirname(fixed)
+        return os.path.abspath(fixed) if fixed else None
+
+    def to_dict(self):
+        return {"folder": self.folder, "patterns": self.patterns, "output": self.output,
+                "delete": self.delete, "recursive": self.recursive, "sniff": self.sniff,
+                **self.members.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["folder"], data.get("patterns"), data.get("output"),
+                   bool(data.get("delete", False)), bool(data.get("recursive", False)),
+                   bool(data.get("sniff", True)), MemberFilter.from_dict(data))
+
+
+def load_roots(path):
+    with open(path, encoding="utf-8") as f:
+        return [WatchRoot.from_dict(entry) for entry in json.load(f)]
+
+
+def excluded_folders(roots):
+    return {base for base in (root.output_base() for root in roots) if base}
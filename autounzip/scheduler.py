@@ -0,0 +1,419 @@
+import collections
+import heapq
+import itertools
+import logging
+import os
+import shutil
+import threading
+import time
+
+from .progress import Throttle
+
+log = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+def default_worker_count():
+    return os.cpu_count() or 1
+
+
+def _stat_or_none(path):
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _existing_ancestor(path):
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, archive, extract_path, delete_after=False, priority=0, volumes=None, members=None):
+        self.id = next(Job._ids)
+        self.archive = archive
+        self.volumes = list(volumes) if volumes else [archive]
+        self.members = members
+        self.extract_path = extract_path
+        self.delete_after = delete_after
+        self.priority = priority
+        self.stat = _stat_or_none(archive)
+        self.content_hash = None
+        self.unpacked_size = None
+        self.entries = None
+        self.planned = False
+        self.error = None
+        self.state = PENDING
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = None
+        self._progress_sink = None
+
+    def report_progress(self, progress):
+        self.progress = progress
+        if self._progress_sink is not None:
+            self._progress_sink(progress)
+
+    def remaining_bytes(self):
+        # What the job is still expected to write, from its planned size.
+        if not self.unpacked_size:
+            return 0
+        done = self.progress.bytes_done if self.progress is not None else 0
+        return max(0, self.unpacked_size - done)
+
+    def throughput(self):
+        if self.progress is None or self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.progress.bytes_done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def success(self):
+        return self.state == DONE
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.state} {self.archive}>"
+
+
+class JobQueue:
+    # Lower priority values run first; jobs with the same priority run in
+    # submission order, or smallest first with shortest_first. Reprioritised
+    # or cancelled entries are left in the heap and skipped when popped.
+
+    def __init__(self, shortest_first=False):
+        self.shortest_first = shortest_first
+        self._heap = []
+        self._entries = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def put(self, job):
+        with self._cond:
+            self._push(job)
+            self._cond.notify()
+
+    def _push(self, job, seq=None):
+        size = (job.unpacked_size or 0) if self.shortest_first else 0
+        entry = [job.priority, size, next(self._seq) if seq is None else seq, job]
+        self._entries[job.id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def get(self, timeout=None, admit=None):
+        # admit, if given, can hold jobs back; the best job it accepts is
+        # returned and the ones it declined stay queued in order.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                held = []
+                try:
+                    while self._heap:
+                        entry = heapq.heappop(self._heap)
+                        job = entry[-1]
+                        if job is None or self._entries.get(job.id) is not entry:
+                            continue
+                        if admit is not None and not admit(job):
+                            held.append(entry)
+                            continue
+                        del self._entries[job.id]
+                        return job
+                finally:
+                    for entry in held:
+                        heapq.heappush(self._heap, entry)
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+
+    def remove(self, job_id):
+        with self._cond:
+            entry = self._entries.pop(job_id, None)
+            if entry is None:
+                return None
+            job = entry[-1]
+            entry[-1] = None
+            return job
+
+    def reprioritise(self, job_id, priority):
+        with self._cond:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return None
+            job = entry[-1]
+            entry[-1] = None
+            job.priority = priority
+            self._push(job)
+            self._cond.notify()
+            return job
+
+    def refresh(self, job_id):
+        # Re-sorts a queued job whose expected size is now known, keeping its
+        # place among jobs of the same size, and wakes workers that may have
+        # been holding it back.
+        with self._cond:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return False
+            job = entry[-1]
+            if entry[1] != ((job.unpacked_size or 0) if self.shortest_first else 0):
+                # The old entry keeps its key, so the new one mustn't tie
+                # with it.
+                entry[-1] = None
+                self._push(job, entry[2])
+            self._cond.notify_all()
+            return True
+
+    def pending(self):
+        with self._cond:
+            entries = sorted(self._entries.values(), key=lambda e: e[:-1])
+            return [e[-1] for e in entries]
+
+    def top_priority(self):
+        with self._cond:
+            if not self._entries:
+                return 0
+            return min(e[0] for e in self._entries.values())
+
+    def clear(self):
+        with self._cond:
+            jobs = [e[-1] for e in self._entries.values()]
+            for entry in self._entries.values():
+                entry[-1] = None
+            self._entries.clear()
+            self._heap = []
+            return jobs
+
+
+class ExtractionScheduler:
+    # Runs queued jobs on a bounded pool of worker threads. Listeners are
+    # called as listener(event, job) from whichever thread caused the event,
+    # with event one of "queued", "started", "progress", "finished",
+    # "cancelled" or "reprioritised". Progress events are throttled to one
+    # per progress_interval seconds per job.
+    #
+    # If run_job has a plan(job) method it is called for every submitted
+    # job on a planner thread, so submit() never waits for archive headers
+    # or an external listing, to fill in the job's expected size. With
+    # disk_reserve set, a job is only started once it is planned and its
+    # expected size fits into the free space of its target filesystem, less
+    # disk_reserve bytes and what running jobs there are still expected to
+    # write; smaller jobs behind it may go first.
+
+    def __init__(self, run_job, workers=None, progress_interval=0.25, disk_reserve=None, shortest_first=False):
+        self.run_job = run_job
+        self.workers = max(1, workers or default_worker_count())
+        self.progress_interval = progress_interval
+        self.disk_reserve = disk_reserve
+        self.queue = JobQueue(shortest_first)
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._running = {}
+        self._outstanding = 0
+        self._idle = threading.Condition(self._lock)
+        self._alive = 0
+        self._stopping = threading.Event()
+        self._threads = []
+        self._to_plan = collections.deque()
+        self._plan_cond = threading.Condition()
+        self._planner_thread = None
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, event, job):
+        for listener in list(self.listeners):
+            try:
+                listener(event, job)
+            except Exception:
+                log.exception("Scheduler listener failed")
+
+    def start(self):
+        self._stopping.clear()
+        self._spawn_workers()
+        if self._planner_thread is None or not self._planner_thread.is_alive():
+            self._planner_thread = threading.Thread(target=self._planner, name="extract-planner", daemon=True)
+            self._planner_thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stopping.set()
+        with self._plan_cond:
+            self._to_plan.clear()
+            self._plan_cond.notify_all()
+        for job in self.queue.clear():
+            job.state = CANCELLED
+            self._settle()
+            self._notify("cancelled", job)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = [t for t in self._threads if t.is_alive()]
+
+    def set_workers(self, workers):
+        with self._lock:
+            self.workers = max(1, workers)
+        if not self._stopping.is_set():
+            self._spawn_workers()
+        log.info(f"Extraction pool size set to {self.workers}")
+
+    def _spawn_workers(self):
+        with self._lock:
+            missing = self.workers - self._alive
+            self._alive += max(0, missing)
+        for _ in range(missing):
+            thread = threading.Thread(target=self._worker, name="extract-worker", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        self._threads = [t for t in self._threads if t.is_alive()]
+
+    def _retire(self):
+        with self._lock:
+            if self._stopping.is_set() or self._alive > self.workers:
+                self._alive -= 1
+                return True
+            return False
+
+    def _settle(self):
+        with self._lock:
+            self._outstanding -= 1
+            if self._outstanding == 0:
+                self._idle.notify_all()
+
+    def wait_idle(self, timeout=None):
+        with self._lock:
+            return self._idle.wait_for(lambda: self._outstanding == 0, timeout)
+
+    def submit(self, archive, extract_path, delete_after=False, priority=0, volumes=None, members=None):
+        # members is a MemberFilter for extracting only part of the archive.
+        job = Job(archive, extract_path, delete_after, priority, volumes, members)
+        job.planned = getattr(self.run_job, "plan", None) is None
+        with self._lock:
+            self._outstanding += 1
+        self.queue.put(job)
+        self._notify("queued", job)
+        if not job.planned:
+            with self._plan_cond:
+                self._to_plan.append(job)
+                self._plan_cond.notify()
+        return job
+
+    def _planner(self):
+        while not self._stopping.is_set():
+            with self._plan_cond:
+                self._plan_cond.wait_for(lambda: self._to_plan or self._stopping.is_set(), timeout=0.5)
+                if not self._to_plan:
+                    continue
+                job = self._to_plan.popleft()
+            # Jobs that were cancelled or already started need no plan.
+            if job.state == PENDING:
+                try:
+                    self.run_job.plan(job)
+                except Exception as e:
+                    log.error(f"Could not plan {job.archive}: {e}")
+            job.planned = True
+            self.queue.refresh(job.id)
+
+    def cancel(self, job_id):
+        job = self.queue.remove(job_id)
+        if job is None:
+            return False
+        job.state = CANCELLED
+        job.finished_at = time.time()
+        self._settle()
+        self._notify("cancelled", job)
+        return True
+
+    def reprioritise(self, job_id, priority):
+        job = self.queue.reprioritise(job_id, priority)
+        if job is None:
+            return False
+        self._notify("reprioritised", job)
+        return True
+
+    def move_to_front(self, job_id):
+        return self.reprioritise(job_id, self.queue.top_priority() - 1)
+
+    def counts(self):
+        with self._lock:
+            running = len(self._running)
+        return len(self.queue), running
+
+    def running_jobs(self):
+        with self._lock:
+            return list(self._running.values())
+
+    def _admit(self, job):
+        # Called with the queue locked. Admitted jobs are marked running
+        # straight away so the next decision accounts for them.
+        if not job.planned:
+            return False
+        target = _existing_ancestor(job.extract_path)
+        try:
+            device = os.stat(target).st_dev
+            free = shutil.disk_usage(target).free
+        except OSError:
+            device, free = None, None
+        with self._lock:
+            if free is not None and job.unpacked_size:
+                others = [j for j in self._running.values() if getattr(j, "_device", None) == device]
+                available = free - self.disk_reserve - sum(j.remaining_bytes() for j in others)
+                if job.unpacked_size > available:
+                    if others:
+                        if not getattr(job, "_held", False):
+                            job._held = True
+                            log.info(f"Holding {job.archive} back until there is room for "
+                                     f"{job.unpacked_size} bytes on {target}")
+                        return False
+                    job.error = (f"needs {job.unpacked_size} bytes but only {max(0, available)} "
+                                 f"are available on {target}")
+            job._device = device
+            self._running[job.id] = job
+        return True
+
+    def _worker(self):
+        while not self._retire():
+            job = self.queue.get(timeout=0.5, admit=self._admit if self.disk_reserve is not None else None)
+            if job is None:
+                continue
+            job.state = RUNNING
+            job.started_at = time.time()
+            job._progress_sink = Throttle(lambda p, job=job: self._notify("progress", job),
+                                          self.progress_interval)
+            with self._lock:
+                self._running[job.id] = job
+            self._notify("started", job)
+            try:
+                if job.error is not None:
+                    log.error(f"Not extracting {job.archive}: {job.error}")
+                    ok = False
+                else:
+                    ok = self.run_job(job)
+            except Exception as e:
+                log.error(f"Exception during extraction: {str(e)}")
+                job.error = e
+                ok = False
+            job._progress_sink = None
+            job.state = DONE if ok else FAILED
+            job.finished_at = time.time()
+            with self._lock:
+                self._running.pop(job.id, None)
+            self._notify("finished", job)
+            self._settle()
@@ -0,0 +1,150 @@
+import bz2
+import collections
+import io
+import lzma
+import os
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZIP_SIGNATURES = (b"PK\x03\x04", b"PK\x05\x06", b"PK\x07\x08")
+RAR4_SIGNATURE = b"Rar!\x1a\x07\x00"
+RAR5_SIGNATURE = b"Rar!\x1a\x07\x01\x00"
+SEVEN_ZIP_SIGNATURE = b"7z\xbc\xaf\x27\x1c"
+GZIP_SIGNATURE = b"\x1f\x8b"
+XZ_SIGNATURE = b"\xfd7zXZ\x00"
+ZSTD_SIGNATURE = b"\x28\xb5\x2f\xfd"
+BZIP2_SIGNATURE = b"BZh"
+TAR_MAGIC_OFFSET = 257
+TAR_MAGIC = b"ustar"
+
+DECOMPRESSION_ERRORS = (zlib.error, OSError, EOFError, lzma.LZMAError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ())
+
+HEAD_SIZE = 512
+# How much of a compressed stream is read to look for a tar header inside.
+PEEK_INPUT_SIZE = 256 * 1024
+
+# Formats are named after the extension they usually carry. "gz", "bz2", "xz"
+# and "zst" are compressed single files rather than archives.
+NAME_FORMATS = (
+    (".tar.gz", "tar.gz"), (".tgz", "tar.gz"),
+    (".tar.bz2", "tar.bz2"), (".tbz2", "tar.bz2"),
+    (".tar.xz", "tar.xz"), (".txz", "tar.xz"),
+    (".tar.zst", "tar.zst"), (".tzst", "tar.zst"),
+    (".tar", "tar"), (".zip", "zip"), (".rar", "rar"), (".7z", "7z"),
+)
+ARCHIVE_FORMATS = {fmt for _, fmt in NAME_FORMATS}
+
+
+def format_from_name(name):
+    lower = name.lower()
+    for suffix, fmt in NAME_FORMATS:
+        if lower.endswith(suffix):
+            return fmt
+    return None
+
+
+def _decompressed_head(compression, data):
+    try:
+        if compression == "gz":
+            return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(data, HEAD_SIZE)
+        if compression == "bz2":
+            return bz2.BZ2Decompressor().decompress(data, HEAD_SIZE)
+        if compression == "xz":
+            return lzma.LZMADecompressor().decompress(data, HEAD_SIZE)
+        if compression == "zst" and zstandard is not None:
+            return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read(HEAD_SIZE)
+    except DECOMPRESSION_ERRORS:
+        pass
+    return b""
+
+
+def sniff(path):
+    # Identifies an archive by its leading bytes. Returns one of
+    # ARCHIVE_FORMATS, a bare compression format, or None.
+    with open(path, "rb") as f:
+        head = f.read(HEAD_SIZE)
+        if head.startswith(ZIP_SIGNATURES):
+            return "zip"
+        if head.startswith((RAR4_SIGNATURE, RAR5_SIGNATURE)):
+            return "rar"
+        if head.startswith(SEVEN_ZIP_SIGNATURE):
+            return "7z"
+        if head[TAR_MAGIC_OFFSET:TAR_MAGIC_OFFSET + len(TAR_MAGIC)] == TAR_MAGIC:
+            return "tar"
+
+        if head.startswith(GZIP_SIGNATURE):
+            compression = "gz"
+        elif head.startswith(XZ_SIGNATURE):
+            compression = "xz"
+        elif head.startswith(ZSTD_SIGNATURE):
+            compression = "zst"
+        elif head.startswith(BZIP2_SIGNATURE) and head[3:4].isdigit():
+            compression = "bz2"
+        else:
+            return None
+        data = head + f.read(PEEK_INPUT_SIZE - len(head))
+
+    inner = _decompressed_head(compression, data)
+    if len(inner) >= TAR_MAGIC_OFFSET + len(TAR_MAGIC):
+        is_tar = inner[TAR_MAGIC_OFFSET:TAR_MAGIC_OFFSET + len(TAR_MAGIC)] == TAR_MAGIC
+    else:
+        # Not enough came out to tell, e.g. a bzip2 block larger than the
+        # peek; trust the name.
+        is_tar = format_from_name(path) == "tar." + compression
+    return "tar." + compression if is_tar else compression
+
+
+def detect_format(path):
+    # The archive's format by content. The name only decides for files that
+    # can't be read and for pre-POSIX tarballs, which carry no signature; a
+    # readable .zip that isn't one gives None.
+    try:
+        fmt = sniff(path)
+    except OSError:
+        return format_from_name(path)
+    if fmt is None and format_from_name(path) == "tar":
+        return "tar"
+    return fmt
+
+
+class SniffCache:
+    # Remembers sniff() results by (device, inode, size, mtime), so each
+    # version of a file is read at most once however often its folder is
+    # scanned.
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def format(self, path, st=None):
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return None
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        try:
+            fmt = sniff(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._entries[key] = fmt
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fmt
+
+    def is_archive(self, path, st=None):
+        return self.format(path, st) in ARCHIVE_FORMATS
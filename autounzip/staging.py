@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import shutil
+
+from .readiness import file_identity
+
+log = logging.getLogger(__name__)
+
+STAGING_PREFIX = "."
+STAGING_SUFFIX = ".partial"
+JOURNAL_NAME = ".autounzip-journal"
+
+
+def staging_path(extract_path):
+    # A hidden sibling of the output folder, so it is on the same filesystem
+    # and publishing it is a rename.
+    parent, name = os.path.split(os.path.normpath(os.path.abspath(extract_path)))
+    return os.path.join(parent, f"{STAGING_PREFIX}{name}{STAGING_SUFFIX}")
+
+
+def _merge_into(source, target):
+    # Moves everything under source into the existing folder target, entry
+    # by entry, replacing what is already there.
+    for entry in os.scandir(source):
+        destination = os.path.join(target, entry.name)
+        if entry.is_dir(follow_symlinks=False) and os.path.isdir(destination) \
+                and not os.path.islink(destination):
+            _merge_into(entry.path, destination)
+            continue
+        if os.path.isdir(destination) and not os.path.islink(destination):
+            shutil.rmtree(destination)
+        os.replace(entry.path, destination)
+    os.rmdir(source)
+
+
+class Journal:
+    # Append-only record of the members already written to a staging folder.
+    # The first line identifies the archive (size and mtime of each volume);
+    # every further line is one finished member with its size and, for ZIPs,
+    # its CRC-32. A torn last line from a crash is ignored.
+
+    def __init__(self, staging, volumes):
+        self.path = os.path.join(staging, JOURNAL_NAME)
+        self.identity = [list(v) for v in file_identity(*volumes) or ()]
+        self.done = {}
+        self._file = None
+
+    def __len__(self):
+        return len(self.done)
+
+    def load(self):
+        # Returns False when there is no journal or it belongs to a different
+        # version of the archive.
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return False
+        if not lines:
+            return False
+        try:
+            if json.loads(lines[0]).get("archive") != self.identity:
+                return False
+        except (ValueError, AttributeError):
+            return False
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+                self.done[entry["name"]] = (entry["size"], entry.get("crc"))
+            except (ValueError, KeyError, TypeError):
+                continue
+        return True
+
+    def open(self):
+        fresh = not os.path.exists(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if fresh:
+            self._write({"archive": self.identity})
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def has(self, name, size, crc, target):
+        # A member counts as written when the journal has it with the same
+        # size and CRC and the file on disk still has that size.
+        if self.done.get(name) != (size, crc):
+            return False
+        try:
+            return os.path.getsize(target) == size
+        except OSError:
+            return False
+
+    def record(self, name, size, crc=None):
+        self.done[name] = (size, crc)
+        self._write({"name": name, "size": size, "crc": crc})
+
+
+class Staging:
+    # Extraction happens in a staging folder next to extract_path that only
+    # becomes extract_path once everything was written. A staging folder
+    # left behind by an interrupted run is resumed when its journal matches
+    # the archive and started over otherwise.
+
+    def __init__(self, extract_path, volumes):
+        self.extract_path = os.path.abspath(extract_path)
+        self.path = staging_path(extract_path)
+        self.journal = Journal(self.path, volumes)
+
+    def open(self):
+        if os.path.isdir(self.path):
+            if self.journal.load():
+                log.info(f"Resuming extraction into {self.extract_path}, "
+                         f"{len(self.journal)} entries are already done")
+            else:
+                shutil.rmtree(self.path)
+        os.makedirs(self.path, exist_ok=True)
+        self.journal.open()
+
+    def publish(self):
+        # A new output folder appears in a single rename. An existing one is
+        # updated entry by entry, as extracting into it used to.
+        self.journal.close()
+        os.remove(self.journal.path)
+        if os.path.isdir(self.extract_path):
+            _merge_into(self.path, self.extract_path)
+        else:
+            os.makedirs(os.path.dirname(self.extract_path), exist_ok=True)
+            os.rename(self.path, self.extract_path)
+
+    def close(self):
+        # Leaves the staging folder for the next attempt to resume.
+        self.journal.close()
+
+    def discard(self):
+        self.journal.close()
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,89 @@
+import os
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# zlib releases the GIL while it checksums or inflates a large buffer, so
+# threads reading big chunks keep several cores busy.
+VERIFY_READ_SIZE = 4 * 1024 * 1024
+
+
+def default_verify_workers():
+    return min(8, os.cpu_count() or 1)
+
+
+def file_crc(path):
+    crc = 0
+    size = 0
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            chunk = f.read(VERIFY_READ_SIZE)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+    return size, crc
+
+
+def verify_tree(root, entries, workers=None, skip=None):
+    # Checks the files under root against (name, size, crc) entries from an
+    # archive listing; crc may be None where the format doesn't record one,
+    # and then only the size is compared. skip(name) leaves out members that
+    # were not meant to be on disk, such as expanded nested archives.
+    # Returns a list of problems, empty when everything matched.
+    def check(entry):
+        name, size, crc = entry
+        path = os.path.join(root, name)
+        try:
+            if crc is None:
+                actual_size, actual_crc = os.path.getsize(path), None
+            else:
+                actual_size, actual_crc = file_crc(path)
+        except FileNotFoundError:
+            if skip is not None and skip(name):
+                return None
+            return f"{name} is missing"
+        except OSError as e:
+            return f"{name} can't be read: {e}"
+        if actual_size != size:
+            return f"{name} is {actual_size} bytes, expected {size}"
+        if actual_crc != crc:
+            return f"{name} has CRC {actual_crc:08x}, expected {crc:08x}"
+        return None
+
+    with ThreadPoolExecutor(workers or default_verify_workers(), thread_name_prefix="verify") as pool:
+        return [problem for problem in pool.map(check, entries) if problem]
+
+
+def test_zip(archive, workers=None):
+    # Decompresses every member without writing it anywhere; zipfile checks
+    # each CRC as the member is read to the end. Every thread reads through
+    # its own handle. Returns a list of problems.
+    local = threading.local()
+    handles = []
+    lock = threading.Lock()
+
+    def check(info):
+        if not hasattr(local, "zf"):
+            local.zf = zipfile.ZipFile(archive)
+            with lock:
+                handles.append(local.zf)
+        try:
+            with local.zf.open(info) as src:
+                while src.read(VERIFY_READ_SIZE):
+                    pass
+        except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+            return f"{info.filename}: {e}"
+        except (NotImplementedError, RuntimeError) as e:
+            return f"{info.filename} can't be tested: {e}"
+        return None
+
+    with zipfile.ZipFile(archive) as zf:
+        members = sorted((i for i in zf.infolist() if not i.is_dir()), key=lambda i: i.file_size, reverse=True)
+    try:
+        with ThreadPoolExecutor(workers or default_verify_workers(), thread_name_prefix="verify") as pool:
+            return [problem for problem in pool.map(check, members) if problem]
+    finally:
+        for handle in handles:
+            handle.close()
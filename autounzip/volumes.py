@@ -0,0 +1,206 @@
+import os
+import re
+import struct
+import threading
+import time
+
+SPLIT = "split"
+RAR_PARTS = "rar-parts"
+RAR_OLD = "rar-old"
+ZIP_SPLIT = "zip-split"
+
+_RAR_PART = re.compile(r"^(?P<base>.+)\.part(?P<num>\d+)\.rar$", re.IGNORECASE)
+_SPLIT = re.compile(r"^(?P<base>.+\.(?:7z|zip|rar|tgz|tar(?:\.(?:gz|bz2|xz|zst))?))\.(?P<num>\d{3})$",
+                    re.IGNORECASE)
+_RAR_OLD = re.compile(r"^(?P<base>.+)\.r(?P<num>\d{2})$", re.IGNORECASE)
+_ZIP_SPLIT = re.compile(r"^(?P<base>.+)\.z(?P<num>\d{2})$", re.IGNORECASE)
+
+RAR4_SIGNATURE = b"Rar!\x1a\x07\x00"
+RAR4_MAIN_HEAD = 0x73
+RAR4_MHD_VOLUME = 0x0001
+SEVEN_ZIP_SIGNATURE = b"7z\xbc\xaf\x27\x1c"
+ZIP_EOCD_SIGNATURE = b"PK\x05\x06"
+
+# A set whose volumes are contiguous but whose completeness can't be proven
+# from headers is dispatched once no volume has changed for this long.
+STALE_SET_SECONDS = 120
+
+
+def parse_volume(name):
+    # Returns (base, kind, index) for names that are part of a multi-volume
+    # set, with index 1 being the volume extraction starts from. The .rar and
+    # .zip heads of old-style RAR and split ZIP sets look like single archives
+    # by name, so those are recognised with declares_volumes() instead.
+    match = _RAR_PART.match(name)
+    if match:
+        return match.group("base"), RAR_PARTS, int(match.group("num"))
+    match = _SPLIT.match(name)
+    if match and int(match.group("num")) > 0:
+        return match.group("base"), SPLIT, int(match.group("num"))
+    match = _RAR_OLD.match(name)
+    if match:
+        return match.group("base"), RAR_OLD, int(match.group("num")) + 2
+    match = _ZIP_SPLIT.match(name)
+    if match and int(match.group("num")) > 0:
+        return match.group("base"), ZIP_SPLIT, int(match.group("num"))
+    return None
+
+
+def volume_head(name):
+    # The (base, kind, index) a plain .rar or .zip would have if it turned out
+    # to be the head of a set.
+    lower = name.lower()
+    if lower.endswith(".rar"):
+        return name[:-4], RAR_OLD, 1
+    if lower.endswith(".zip"):
+        return name[:-4], ZIP_SPLIT, 0
+    return None
+
+
+def declares_volumes(path):
+    # True when a .rar or .zip says in its own headers that it belongs to a
+    # multi-volume set.
+    lower = path.lower()
+    try:
+        with open(path, "rb") as f:
+            if lower.endswith(".rar"):
+                head = f.read(len(RAR4_SIGNATURE) + 7)
+                if not head.startswith(RAR4_SIGNATURE):
+                    return False
+                _, head_type, flags = struct.unpack_from("<HBH", head, len(RAR4_SIGNATURE))
+                return head_type == RAR4_MAIN_HEAD and bool(flags & RAR4_MHD_VOLUME)
+            if lower.endswith(".zip"):
+                return _zip_disk_number(f) > 0
+    except (OSError, struct.error):
+        return False
+    return False
+
+
+def _zip_disk_number(f):
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    distance = min(size, 22 + 65535)
+    f.seek(size - distance)
+    tail = f.read(distance)
+    pos = tail.rfind(ZIP_EOCD_SIGNATURE)
+    if pos < 0 or pos + 22 > len(tail):
+        return -1
+    return struct.unpack_from("<H", tail, pos + 4)[0]
+
+
+def _seven_zip_total_size(path):
+    with open(path, "rb") as f:
+        header = f.read(32)
+    if len(header) < 32 or not header.startswith(SEVEN_ZIP_SIGNATURE):
+        return None
+    next_header_offset, next_header_size = struct.unpack_from("<QQ", header, 12)
+    return 32 + next_header_offset + next_header_size
+
+
+class VolumeSet:
+    def __init__(self, folder, base, kind):
+        self.folder = folder
+        self.base = base
+        self.kind = kind
+        self.volumes = {}
+        self.changed_at = time.monotonic()
+
+    @property
+    def key(self):
+        return (self.folder, self.base.lower(), self.kind)
+
+    def add(self, index, path):
+        if self.volumes.get(index) != path:
+            self.volumes[index] = path
+            self.changed_at = time.monotonic()
+
+    @property
+    def first(self):
+        # The volume extraction is started from.
+        if self.kind == ZIP_SPLIT:
+            return self.volumes.get(0)
+        return self.volumes.get(1)
+
+    def paths(self):
+        return [self.volumes[i] for i in sorted(self.volumes)]
+
+    def _contiguous(self, indexes):
+        return all(i in self.volumes for i in indexes)
+
+    def is_complete(self):
+        if self.first is None:
+            return False
+        try:
+            sizes = {i: os.path.getsize(p) for i, p in self.volumes.items()}
+        except OSError:
+            return False
+
+        if self.kind == ZIP_SPLIT:
+            # The .zip is the last volume and its EOCD records how many came
+            # before it.
+            with open(self.first, "rb") as f:
+                disks = _zip_disk_number(f)
+            return disks >= 0 and self._contiguous(range(1, disks + 1))
+
+        count = max(self.volumes)
+        if not self._contiguous(range(1, count + 1)):
+            return False
+
+        if self.kind == SPLIT and self.base.lower().endswith(".7z"):
+            total = _seven_zip_total_size(self.first)
+            if total is not None:
+                return sum(sizes.values()) >= total
+
+        # Volumes are written at a fixed size except the last, which is
+        # shorter; a shorter tail means nothing comes after it.
+        if count > 1 and sizes[count] < sizes[1]:
+            return True
+        return time.monotonic() - self.changed_at >= STALE_SET_SECONDS
+
+
+class VolumeSetTracker:
+    # Groups volumes by set as the monitor sees them and reports sets that
+    # are complete. The monitor extracts a complete set once, from its first
+    # volume, and treats every volume as processed.
+
+    def __init__(self):
+        self.sets = {}
+        self._by_path = {}
+        self._lock = threading.Lock()
+
+    def add(self, folder, name, volume):
+        base, kind, index = volume
+        key = (folder, base.lower(), kind)
+        path = os.path.join(folder, name)
+        with self._lock:
+            volume_set = self.sets.get(key)
+            if volume_set is None:
+                volume_set = self.sets[key] = VolumeSet(folder, base, kind)
+            volume_set.add(index, path)
+            self._by_path[path] = volume_set
+        return volume_set
+
+    def has_siblings(self, folder, name):
+        head = volume_head(name)
+        if head is None:
+            return False
+        base, kind, _ = head
+        with self._lock:
+            return (folder, base.lower(), kind) in self.sets
+
+    def complete_sets(self, pending=None):
+        # pending filters out sets the caller has already dealt with before
+        # any volume is read.
+        with self._lock:
+            candidates = list(self.sets.values())
+        return [s for s in candidates if (pending is None or pending(s)) and s.is_complete()]
+
+    def set_for(self, path):
+        with self._lock:
+            return self._by_path.get(path)
+
+    def remove(self, volume_set):
+        with self._lock:
+            self.sets.pop(volume_set.key, None)
+            for path in volume_set.volumes.values():
+                self._by_path.pop(path, None)
@@ -0,0 +1,238 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+log = logging.getLogger(__name__)
+
+BACKENDS = ("auto", "inotify", "polling")
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Directory mtimes have coarse granularity on some filesystems; a folder
+# modified this recently is listed again even if its mtime looks unchanged.
+MTIME_SLACK = 2.0
+
+
+def _scan(folder, files, subdirs, excluded):
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.path not in excluded:
+                    subdirs.append(entry.path)
+            else:
+                files.append(entry.path)
+
+
+class PollingWatcher:
+    # Scans every folder once per interval with os.scandir. A folder whose
+    # mtime hasn't changed since the last scan has no new entries, so only
+    # its subfolders are visited. Used where inotify is not available and as
+    # the fallback when it can't be set up.
+    name = "polling"
+
+    def __init__(self, folders, interval, excluded=()):
+        # folders is a list of (path, recursive) pairs.
+        self.folders = list(folders)
+        self.interval = interval
+        self.excluded = set(excluded)
+        self._dirs = {}
+        self._next_scan = 0.0
+
+    def changes(self, timeout):
+        now = time.monotonic()
+        if now < self._next_scan:
+            time.sleep(min(timeout, self._next_scan - now))
+            return []
+        self._next_scan = now + self.interval
+        return self.scan()
+
+    def scan(self):
+        paths = []
+        seen = {}
+        for folder, recursive in self.folders:
+            self._visit(folder, recursive, paths, seen)
+        self._dirs = seen
+        return paths
+
+    def _visit(self, folder, recursive, paths, seen):
+        try:
+            st = os.stat(folder)
+        except OSError:
+            return
+        cached = self._dirs.get(folder)
+        if cached is not None and cached[0] == st.st_mtime_ns and time.time() - st.st_mtime > MTIME_SLACK:
+            subdirs = cached[1]
+        else:
+            subdirs = []
+            try:
+                _scan(folder, paths, subdirs, self.excluded)
+            except OSError as e:
+                log.debug(f"Could not scan {folder}: {e}")
+                return
+        seen[folder] = (st.st_mtime_ns, subdirs)
+        if recursive:
+            for subdir in subdirs:
+                self._visit(subdir, True, paths, seen)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    # Reports paths that were closed after writing or moved into a watched
+    # folder, for any number of folders on a single inotify descriptor.
+    # Recursive folders get a watch per subfolder, including ones created
+    # later. The first call returns the full listing so files that were
+    # already there are not missed; a queue overflow triggers another one.
+    name = "inotify"
+    _libc = None
+
+    def __init__(self, folders, excluded=()):
+        self.folders = list(folders)
+        self.excluded = set(excluded)
+        libc = self._load_libc()
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._watches = {}
+        self._roots = set()
+        try:
+            for folder, recursive in self.folders:
+                self._roots.add(self._add_watch(folder, recursive))
+        except OSError:
+            os.close(self.fd)
+            raise
+        self._rescan = True
+
+    @classmethod
+    def _load_libc(cls):
+        if cls._libc is None:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            libc.inotify_init1.argtypes = [ctypes.c_int]
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            cls._libc = libc
+        return cls._libc
+
+    def _add_watch(self, folder, recursive):
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+        if recursive:
+            mask |= IN_CREATE
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(folder), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), folder)
+        self._watches[wd] = (folder, recursive)
+        return wd
+
+    def _list(self, folder, recursive):
+        # Lists folder, and for recursive folders adds watches for the
+        # subfolders on the way down.
+        files, subdirs = [], []
+        try:
+            _scan(folder, files, subdirs, self.excluded)
+        except OSError as e:
+            log.debug(f"Could not scan {folder}: {e}")
+            return files
+        if recursive:
+            for subdir in subdirs:
+                try:
+                    self._add_watch(subdir, True)
+                except OSError as e:
+                    log.warning(f"Can't watch {subdir}: {e}")
+                    continue
+                files.extend(self._list(subdir, True))
+        return files
+
+    def scan(self):
+        paths = []
+        for folder, recursive in self.folders:
+            paths.extend(self._list(folder, recursive))
+        return paths
+
+    def changes(self, timeout):
+        if self._rescan:
+            self._rescan = False
+            return self.scan()
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        paths = []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return paths
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                log.warning("Watcher event queue overflowed, rescanning folders")
+                return self.scan()
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                folder, _ = self._watches.pop(wd, (None, False))
+                if wd in self._roots:
+                    raise FileNotFoundError(f"Watched folder {folder} was removed or moved")
+                continue
+            if not name or wd not in self._watches:
+                continue
+
+            folder, recursive = self._watches[wd]
+            path = os.path.join(folder, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if recursive and mask & (IN_CREATE | IN_MOVED_TO) and path not in self.excluded:
+                    try:
+                        self._add_watch(path, True)
+                    except OSError as e:
+                        log.warning(f"Can't watch {path}: {e}")
+                        continue
+                    paths.extend(self._list(path, True))
+            elif not mask & IN_CREATE:
+                paths.append(path)
+        return paths
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create_watcher(folders, interval, backend="auto", excluded=()):
+    # folders is a list of (path, recursive) pairs; one watcher covers all of
+    # them. Subfolders in excluded are never descended into.
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown watcher backend: {backend}")
+
+    if backend != "polling" and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folders, excluded)
+        except (OSError, AttributeError) as e:
+            if backend == "inotify":
+                raise
+            log.warning(f"inotify unavailable ({e}), falling back to polling")
+    elif backend == "inotify":
+        raise OSError("inotify is only available on Linux")
+
+    return PollingWatcher(folders, interval, excluded)
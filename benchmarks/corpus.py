@@ -0,0 +1,128 @@
+import json
+import os
+import random
+import shutil
+import tarfile
+import zipfile
+
+CHUNK_SIZE = 1024 * 1024
+CORPUS_VERSION = 1
+
+WORDS = ("archive extract folder monitor queue worker deflate stored header entry volume "
+         "checksum stream buffer latency throughput benchmark corpus synthetic payload").split()
+
+
+def _random_chunks(rng, size):
+    remaining = size
+    while remaining > 0:
+        n = min(CHUNK_SIZE, remaining)
+        yield rng.randbytes(n)
+        remaining -= n
+
+
+def _text_chunks(rng, size):
+    # Highly compressible, but not a single repeated byte, so deflate still
+    # has to do real work.
+    line = " ".join(rng.choice(WORDS) for _ in range(64)).encode() + b"\n"
+    block = (line * (CHUNK_SIZE // len(line) + 1))[:CHUNK_SIZE]
+    remaining = size
+    while remaining > 0:
+        n = min(CHUNK_SIZE, remaining)
+        yield block[:n]
+        remaining -= n
+
+
+def _write_zip_member(zf, name, chunks, compression=zipfile.ZIP_DEFLATED):
+    info = zipfile.ZipInfo(name, date_time=(2024, 1, 1, 0, 0, 0))
+    info.compress_type = compression
+    with zf.open(info, "w", force_zip64=True) as dst:
+        for chunk in chunks:
+            dst.write(chunk)
+
+
+def tiny_zips(folder, rng, scale):
+    count = max(1, int(2000 * scale))
+    for i in range(count):
+        with zipfile.ZipFile(os.path.join(folder, f"tiny_{i:05d}.zip"), "w") as zf:
+            _write_zip_member(zf, f"tiny_{i:05d}.txt", _text_chunks(rng, rng.randint(64, 4096)))
+    return count
+
+
+def large_archives(folder, rng, scale):
+    count = 3
+    size = max(CHUNK_SIZE, int(2 * 1024 ** 3 * scale))
+    for i in range(count):
+        with zipfile.ZipFile(os.path.join(folder, f"large_{i}.zip"), "w", allowZip64=True) as zf:
+            for part in range(4):
+                _write_zip_member(zf, f"large_{i}/part_{part}.bin", _random_chunks(rng, size // 4),
+                                  zipfile.ZIP_STORED)
+    return count
+
+
+def deep_tree(folder, rng, scale):
+    depth = 40
+    files = max(depth, int(20000 * scale))
+    with zipfile.ZipFile(os.path.join(folder, "deep_tree.zip"), "w") as zf:
+        for i in range(files):
+            parts = [f"d{rng.randrange(4)}" for _ in range(rng.randint(1, depth))]
+            name = "/".join(parts + [f"file_{i}.txt"])
+            _write_zip_member(zf, name, _text_chunks(rng, rng.randint(16, 2048)))
+    return 1
+
+
+def compressible(folder, rng, scale):
+    size = max(CHUNK_SIZE, int(512 * 1024 ** 2 * scale))
+    with zipfile.ZipFile(os.path.join(folder, "compressible.zip"), "w", allowZip64=True) as zf:
+        _write_zip_member(zf, "text.log", _text_chunks(rng, size))
+    with open(os.path.join(folder, "compressible.tar.gz"), "wb") as raw:
+        with tarfile.open(fileobj=raw, mode="w:gz") as tar:
+            tmp = os.path.join(folder, ".text.log")
+            with open(tmp, "wb") as f:
+                for chunk in _text_chunks(rng, size):
+                    f.write(chunk)
+            tar.add(tmp, arcname="text.log")
+            os.remove(tmp)
+    return 2
+
+
+def incompressible(folder, rng, scale):
+    size = max(CHUNK_SIZE, int(512 * 1024 ** 2 * scale))
+    with zipfile.ZipFile(os.path.join(folder, "incompressible.zip"), "w", allowZip64=True) as zf:
+        _write_zip_member(zf, "random.bin", _random_chunks(rng, size))
+    return 1
+
+
+SCENARIOS = {
+    "tiny_zips": tiny_zips,
+    "large_archives": large_archives,
+    "deep_tree": deep_tree,
+    "compressible": compressible,
+    "incompressible": incompressible,
+}
+
+
+def ensure_corpus(corpus_dir, scenario, scale=1.0, seed=1234):
+    # Builds the corpus for scenario under corpus_dir/scenario, reusing it when
+    # a previous run generated the same scenario with the same scale and seed.
+    folder = os.path.join(corpus_dir, scenario)
+    manifest_path = os.path.join(folder, "manifest.json")
+    wanted = {"version": CORPUS_VERSION, "scenario": scenario, "scale": scale, "seed": seed}
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if {k: manifest.get(k) for k in wanted} == wanted:
+            return folder, manifest
+
+    shutil.rmtree(folder, ignore_errors=True)
+    archives_dir = os.path.join(folder, "archives")
+    os.makedirs(archives_dir)
+    rng = random.Random(f"{seed}:{scenario}")
+    count = SCENARIOS[scenario](archives_dir, rng, scale)
+
+    names = sorted(os.listdir(archives_dir))
+    manifest = dict(wanted, archives=count,
+                    bytes=sum(os.path.getsize(os.path.join(archives_dir, n)) for n in names))
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return folder, manifest
@@ -0,0 +1,237 @@
+# Benchmarks the monitor + extraction pipeline on synthetic archive corpora.
+#
+# Each scenario runs in its own process so peak RSS and CPU time are not
+# shared between scenarios. Archives are moved into a watched folder while
+# the headless pipeline is running, which measures detection latency as well
+# as end-to-end throughput.
+#
+#     python benchmarks/run.py --scale 0.05
+#     python benchmarks/run.py --scenarios tiny_zips deep_tree --compare benchmarks/results/old.json
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import SCENARIOS, ensure_corpus  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_CORPUS_DIR = os.path.join(ROOT, "benchmarks", ".corpus")
+DEFAULT_RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _usage():
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    return {
+        "cpu_user": own.ru_utime + children.ru_utime,
+        "cpu_system": own.ru_stime + children.ru_stime,
+        "peak_rss_bytes": max(own.ru_maxrss, children.ru_maxrss) * rss_unit,
+    }
+
+
+def run_scenario(scenario, corpus_folder, workers, watcher, interval, timeout, settle):
+    from autounzip.extract import ArchiveExtractor, archive_stem
+    from autounzip.monitor import FolderMonitor
+    from autounzip.readiness import ReadinessTracker
+    from autounzip.roots import WatchRoot
+    from autounzip.scheduler import ExtractionScheduler
+
+    archives_dir = os.path.join(corpus_folder, "archives")
+    names = sorted(os.listdir(archives_dir))
+    input_bytes = sum(os.path.getsize(os.path.join(archives_dir, n)) for n in names)
+
+    workdir = tempfile.mkdtemp(prefix=".run-", dir=corpus_folder)
+    staging = os.path.join(workdir, "staging")
+    watch = os.path.join(workdir, "watch")
+    out = os.path.join(workdir, "out")
+    for folder in (staging, watch, out):
+        os.makedirs(folder)
+    for name in names:
+        _link_or_copy(os.path.join(archives_dir, name), os.path.join(staging, name))
+
+    moved_at = {}
+    detected_at = {}
+    finished = []
+    done = threading.Event()
+    lock = threading.Lock()
+
+    scheduler = ExtractionScheduler(ArchiveExtractor(), workers)
+
+    def on_job_event(event, job):
+        if event != "finished":
+            return
+        with lock:
+            finished.append(job)
+            if len(finished) == len(names):
+                done.set()
+
+    def on_new_file(file_path):
+        detected_at[os.path.basename(file_path)] = time.monotonic()
+        scheduler.submit(file_path, os.path.join(out, archive_stem(file_path)))
+
+    scheduler.add_listener(on_job_event)
+    monitor = FolderMonitor([WatchRoot(watch)], interval, on_new_file, watcher,
+                            readiness=ReadinessTracker(settle))
+    scheduler.start()
+    monitor.start()
+    # Give the watcher time to set up before the first archive lands.
+    time.sleep(1.0)
+
+    usage_before = _usage()
+    started = time.monotonic()
+    for name in names:
+        moved_at[name] = time.monotonic()
+        os.rename(os.path.join(staging, name), os.path.join(watch, name))
+
+    completed = done.wait(timeout)
+    wall = time.monotonic() - started
+    usage_after = _usage()
+
+    monitor.stop()
+    monitor.join()
+    scheduler.stop()
+
+    latencies = [detected_at[n] - moved_at[n] for n in names if n in detected_at]
+    output_bytes = sum(job.progress.bytes_done for job in finished if job.progress is not None)
+    result = {
+        "archives": len(names),
+        "completed": completed,
+        "failed": sum(1 for job in finished if not job.success),
+        "input_bytes": input_bytes,
+        "output_bytes": output_bytes,
+        "wall_seconds": wall,
+        "input_throughput_bytes_per_second": input_bytes / wall if wall else None,
+        "output_throughput_bytes_per_second": output_bytes / wall if wall else None,
+        "archives_per_second": len(finished) / wall if wall else None,
+        "detection_latency_seconds": {
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+            "p50": _percentile(latencies, 0.5),
+            "p95": _percentile(latencies, 0.95),
+            "max": max(latencies) if latencies else None,
+        },
+    }
+    if usage_before and usage_after:
+        result["cpu_user_seconds"] = usage_after["cpu_user"] - usage_before["cpu_user"]
+        result["cpu_system_seconds"] = usage_after["cpu_system"] - usage_before["cpu_system"]
+        result["peak_rss_bytes"] = usage_after["peak_rss_bytes"]
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def compare(old, new):
+    keys = ("wall_seconds", "output_throughput_bytes_per_second", "peak_rss_bytes", "cpu_user_seconds")
+    for scenario, result in new["scenarios"].items():
+        previous = old.get("scenarios", {}).get(scenario)
+        if not previous:
+            continue
+        print(f"{scenario}:")
+        for key in keys:
+            a, b = previous.get(key), result.get(key)
+            if a and b:
+                print(f"  {key:40s} {a:14.3f} -> {b:14.3f} ({(b - a) / a * 100:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Auto-Unzipper pipeline")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--scale", type=float, default=0.05,
+                        help="corpus size multiplier; 1.0 builds the full multi-GB corpus (default: 0.05)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--watcher", choices=("auto", "inotify", "polling"), default="auto")
+    parser.add_argument("--interval", type=int, default=1, help="polling interval in seconds (default: 1)")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="readiness settle window in seconds; part of the measured detection latency")
+    parser.add_argument("--timeout", type=float, default=3600)
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", metavar="RESULTS", help="print the change against an earlier results file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        result = run_scenario(args.child, os.path.join(args.corpus_dir, args.child), args.workers,
+                              args.watcher, args.interval, args.timeout, args.settle)
+        json.dump(result, sys.stdout)
+        return 0
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "workers": args.workers,
+            "watcher": args.watcher,
+            "settle": args.settle,
+        },
+        "scenarios": {},
+    }
+
+    for scenario in args.scenarios:
+        print(f"Preparing {scenario}...", file=sys.stderr)
+        _, manifest = ensure_corpus(args.corpus_dir, scenario, args.scale, args.seed)
+        print(f"Running {scenario} ({manifest['archives']} archives, {manifest['bytes']} bytes)...",
+              file=sys.stderr)
+        command = [sys.executable, os.path.abspath(__file__), "--child", scenario,
+                   "--corpus-dir", args.corpus_dir, "--watcher", args.watcher,
+                   "--interval", str(args.interval), "--timeout", str(args.timeout),
+                   "--settle", str(args.settle)]
+        if args.workers:
+            command += ["--workers", str(args.workers)]
+        process = subprocess.run(command, capture_output=True, text=True)
+        if process.returncode != 0:
+            print(process.stderr, file=sys.stderr)
+            results["scenarios"][scenario] = {"error": process.stderr.strip().splitlines()[-1:]}
+            continue
+        results["scenarios"][scenario] = json.loads(process.stdout)
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
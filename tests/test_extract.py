@@ -0,0 +1,64 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from autounzip.extract import ArchiveExtractor
+from autounzip.scheduler import Job
+
+
+class DamagedArchiveTest(unittest.TestCase):
+    # A damaged archive fails its job without leaving a staging folder or
+    # partial output behind.
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.output = os.path.join(self.tmp, "out")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def extract(self, archive):
+        job = Job(archive, os.path.join(self.output, "archive"))
+        self.assertFalse(ArchiveExtractor(verify=False)(job))
+        # The reason is reported with the job, e.g. by the control API.
+        self.assertIn(archive, str(job.error))
+
+    def assert_nothing_left(self):
+        self.assertEqual(os.listdir(self.output) if os.path.isdir(self.output) else [], [])
+
+    def test_corrupt_zip(self):
+        archive = os.path.join(self.tmp, "corrupt.zip")
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("first.txt", "intact " * 1000)
+            zf.writestr("second.bin", os.urandom(64 * 1024))
+        with zipfile.ZipFile(archive) as zf:
+            info = zf.getinfo("second.bin")
+        # Overwrites the middle of the deflate stream of second.bin.
+        with open(archive, "r+b") as f:
+            f.seek(info.header_offset + 30 + len(info.filename) + info.compress_size // 2)
+            f.write(b"\xff" * 64)
+
+        self.extract(archive)
+        self.assert_nothing_left()
+
+    def test_truncated_tar_gz(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+            data = os.urandom(256 * 1024)
+            member = tarfile.TarInfo("data.bin")
+            member.size = len(data)
+            tar.addfile(member, io.BytesIO(data))
+        archive = os.path.join(self.tmp, "truncated.tar.gz")
+        with open(archive, "wb") as f:
+            f.write(buffer.getvalue()[:len(buffer.getvalue()) // 2])
+
+        self.extract(archive)
+        self.assert_nothing_left()
+
+
+if __name__ == "__main__":
+    unittest.main()